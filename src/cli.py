@@ -1,44 +1,89 @@
 #!/usr/bin/env python3
 """CLI for managing the open-claude-router server."""
 
-import argparse
 import os
 import signal
-import subprocess
 import sys
+import time
 from pathlib import Path
+from typing import NoReturn
 
 PID_FILE = Path('.router.pid')
 LOG_FILE = Path('.router.log')
+TAIL_BLOCK_SIZE = 64 * 1024
+FOLLOW_INTERVAL = 0.1
+PID_CACHE_TTL = 1.0
+PROC_DIR = Path('/proc')
+
+_pid_cache: tuple[float, int | None] | None = None
+
+
+def _is_alive(pid: int) -> bool:
+    """Check whether a process exists, via /proc where available."""
+    if PROC_DIR.is_dir():
+        return (PROC_DIR / str(pid)).exists()
+    try:
+        os.kill(pid, 0)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
+
+
+def _invalidate_pid_cache() -> None:
+    """Forget the cached PID after the server is started or stopped."""
+    global _pid_cache
+    _pid_cache = None
 
 
 def get_pid() -> int | None:
-    """Get the running server PID if any."""
+    """Get the running server PID if any (cached for PID_CACHE_TTL seconds)."""
+    global _pid_cache
+    now = time.monotonic()
+    if _pid_cache is not None and now - _pid_cache[0] < PID_CACHE_TTL:
+        return _pid_cache[1]
+
+    pid = None
     if PID_FILE.exists():
         try:
             pid = int(PID_FILE.read_text().strip())
-            os.kill(pid, 0)
-            return pid
-        except (ValueError, ProcessLookupError, PermissionError):
+        except ValueError:
+            pid = None
+        if pid is None or not _is_alive(pid):
+            pid = None
             PID_FILE.unlink(missing_ok=True)
-    return None
+    _pid_cache = (now, pid)
+    return pid
+
+
+def write_pid_file(pid: int) -> None:
+    """Write the PID file atomically so readers never see a partial PID."""
+    tmp = PID_FILE.with_name(PID_FILE.name + '.tmp')
+    with tmp.open('wb') as f:
+        f.write(f'{pid}\n'.encode())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, PID_FILE)
 
 
 def start_server(detached: bool = False) -> None:
     """Start the router server."""
+    import subprocess
+
     if get_pid():
         print('Server is already running')
         return
 
     if detached:
-        with Path(LOG_FILE).open('w') as log:
+        with Path(LOG_FILE).open('wb') as log:
             proc = subprocess.Popen(
                 [sys.executable, '-m', 'src.main'],
                 stdout=log,
                 stderr=subprocess.STDOUT,
                 start_new_session=True,
+                env={**os.environ, 'PYTHONUNBUFFERED': '1'},
             )
-        PID_FILE.write_text(str(proc.pid))
+        write_pid_file(proc.pid)
+        _invalidate_pid_cache()
         print(f'Server started in background (PID: {proc.pid})')
         print(f'Logs: {LOG_FILE}')
     else:
@@ -62,6 +107,7 @@ def stop_server() -> None:
         print('Server process not found')
     finally:
         PID_FILE.unlink(missing_ok=True)
+        _invalidate_pid_cache()
 
 
 def status() -> None:
@@ -73,61 +119,144 @@ def status() -> None:
         print('Server is not running')
 
 
+def tail_lines(path: Path, n: int) -> list[bytes]:
+    """Return the last n lines of a file, reading backward in blocks."""
+    if n <= 0:
+        return []
+    with path.open('rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        blocks: list[bytes] = []
+        newlines = 0
+        # n + 1 newlines guarantees the oldest wanted line is complete
+        while pos > 0 and newlines <= n:
+            size = min(TAIL_BLOCK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            block = f.read(size)
+            blocks.append(block)
+            newlines += block.count(b'\n')
+    return b''.join(reversed(blocks)).splitlines(keepends=True)[-n:]
+
+
+def follow_file(path: Path) -> None:
+    """Print data appended to a file until interrupted."""
+    out = sys.stdout.buffer
+    with path.open('rb') as f:
+        f.seek(0, os.SEEK_END)
+        try:
+            while True:
+                chunk = f.read()
+                if chunk:
+                    out.write(chunk)
+                    out.flush()
+                elif os.fstat(f.fileno()).st_size < f.tell():
+                    # Truncated (e.g. `start` reopened the log); read from the top
+                    f.seek(0)
+                else:
+                    time.sleep(FOLLOW_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+
+
 def logs(follow: bool = False, lines: int = 50) -> None:
     """Show server logs."""
     if not LOG_FILE.exists():
         print('No log file found')
         return
 
+    sys.stdout.buffer.writelines(tail_lines(LOG_FILE, lines))
+    sys.stdout.buffer.flush()
     if follow:
-        subprocess.run(['tail', '-f', str(LOG_FILE)], check=False)
-    else:
-        subprocess.run(['tail', '-n', str(lines), str(LOG_FILE)], check=False)
+        follow_file(LOG_FILE)
 
 
-def main() -> None:
+USAGE = """\
+usage: router {start,stop,status,logs} ...
+
+Manage the open-claude-router server
+
+commands:
+  start [-d, --detached]               Start the server (in background with -d)
+  stop                                 Stop the server
+  status                               Show server status
+  logs [-f, --follow] [-n, --lines N]  Show server logs (default 50 lines)
+"""
+
+
+# Boolean flags accepted by each command, mapped to their keyword argument
+_FLAGS: dict[str, dict[str, str]] = {
+    'start': {'-d': 'detached', '--detached': 'detached'},
+    'stop': {},
+    'status': {},
+    'logs': {'-f': 'follow', '--follow': 'follow'},
+}
+
+
+def _usage_error(message: str) -> NoReturn:
+    """Print usage and an error to stderr, then exit 2 as argparse does."""
+    print(USAGE, end='', file=sys.stderr)
+    print(f'router: error: {message}', file=sys.stderr)
+    sys.exit(2)
+
+
+def _line_count(value: str | None) -> int:
+    """Validate the -n/--lines value."""
+    if value is None:
+        _usage_error('argument -n/--lines: expected one argument')
+    try:
+        return int(value)
+    except ValueError:
+        _usage_error(f'argument -n/--lines: invalid int value: {value!r}')
+
+
+def _parse_opts(command: str, opts: list[str]) -> dict:
+    """Parse a command's options, rejecting anything it does not accept."""
+    flags = _FLAGS[command]
+    parsed: dict = dict.fromkeys(flags.values(), False)
+    if command == 'logs':
+        parsed['lines'] = 50
+
+    args = iter(opts)
+    for opt in args:
+        if opt in ('-h', '--help'):
+            print(USAGE, end='')
+            sys.exit(0)
+        if opt in flags:
+            parsed[flags[opt]] = True
+        elif command == 'logs' and opt in ('-n', '--lines'):
+            parsed['lines'] = _line_count(next(args, None))
+        elif command == 'logs' and opt.startswith('--lines='):
+            parsed['lines'] = _line_count(opt.partition('=')[2])
+        elif command == 'logs' and opt.startswith('-n'):
+            parsed['lines'] = _line_count(opt[2:])  # -n5
+        else:
+            _usage_error(f'unrecognized arguments: {opt}')
+    return parsed
+
+
+def main(argv: list[str] | None = None) -> None:
     """Main CLI entry point."""
-    parser = argparse.ArgumentParser(
-        description='Manage the open-claude-router server',
-        prog='router',
-    )
-    subparsers = parser.add_subparsers(dest='command', help='Commands')
-
-    start_parser = subparsers.add_parser('start', help='Start the server')
-    start_parser.add_argument(
-        '-d', '--detached',
-        action='store_true',
-        help='Run in background',
-    )
-
-    subparsers.add_parser('stop', help='Stop the server')
-    subparsers.add_parser('status', help='Show server status')
-
-    logs_parser = subparsers.add_parser('logs', help='Show server logs')
-    logs_parser.add_argument(
-        '-f', '--follow',
-        action='store_true',
-        help='Follow log output',
-    )
-    logs_parser.add_argument(
-        '-n', '--lines',
-        type=int,
-        default=50,
-        help='Number of lines to show',
-    )
-
-    args = parser.parse_args()
-
-    if args.command == 'start':
-        start_server(detached=args.detached)
-    elif args.command == 'stop':
+    args = sys.argv[1:] if argv is None else argv
+    if not args:
+        print(USAGE, end='')
+        return
+    if args[0] in ('-h', '--help'):
+        print(USAGE, end='')
+        sys.exit(0)
+
+    command = args[0]
+    if command not in _FLAGS:
+        _usage_error(f'invalid choice: {command!r} (choose from start, stop, status, logs)')
+    opts = _parse_opts(command, args[1:])
+
+    if command == 'start':
+        start_server(**opts)
+    elif command == 'stop':
         stop_server()
-    elif args.command == 'status':
+    elif command == 'status':
         status()
-    elif args.command == 'logs':
-        logs(follow=args.follow, lines=args.lines)
     else:
-        parser.print_help()
+        logs(**opts)
 
 
 if __name__ == '__main__':
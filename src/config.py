@@ -19,6 +19,9 @@ class Config:
     model_override: str | None = os.getenv('MODEL_OVERRIDE') or None
     host: str = os.getenv('HOST', '0.0.0.0')
     port: int = int(os.getenv('PORT', '8787'))
+    workers: int = int(os.getenv('WORKERS', '1'))
+    reload: bool = os.getenv('RELOAD', '0') == '1'
+    access_log: bool = os.getenv('ACCESS_LOG', '0') == '1'
 
 
 config = Config()
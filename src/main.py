@@ -1,19 +1,29 @@
 """FastAPI application for open-claude-router."""
 
-import json
+import functools
 import logging
+import os
+import signal
+import threading
 import time
+from collections.abc import AsyncIterator, Callable
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
 
 import httpx
+import orjson
 import uvicorn
 from fastapi import FastAPI, Header, Request, Response
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from .config import config
+from .models import fetch_models, get_claude_aliases, get_model_by_id
+from .models import get_models, map_model
 from .stream import stream_openai_to_anthropic
-from .transform import anthropic_to_openai, count_tokens, openai_to_anthropic
+from .transform import anthropic_to_openai, count_tokens
+from .transform import openai_to_anthropic
 
 logger = logging.getLogger('uvicorn.error')
 
@@ -21,19 +31,39 @@ logger = logging.getLogger('uvicorn.error')
 STATSIG_CACHE_DIR = Path.home() / '.claude' / 'statsig'
 STATSIG_RESPONSE_FILE = Path(__file__).parent / 'statsig_response.json'
 
+# Fixed response bodies, serialized once at import
+_SUCCESS_BYTES = orjson.dumps({'success': True})
+_EMPTY_BYTES = b'{}'
+_NOT_FOUND_PREFIX = b'{"error":{"message":'
+
+# Signal that drops the memoized statsig response (unavailable on Windows)
+_RELOAD_SIGNAL = getattr(signal, 'SIGUSR1', None)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize models and log startup configuration."""
-    from .models import fetch_models, get_claude_aliases
-
-    await fetch_models()
-    aliases = get_claude_aliases()
-    logger.info(f'Loaded {len(aliases)} Claude aliases: {aliases}')
-    logger.info(f'Router ready on {config.host}:{config.port}')
-    if config.model_override:
-        logger.info(f'Model override: {config.model_override}')
-    yield
+    """Open the shared upstream client, load models, and log configuration."""
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(300.0, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=200,
+            max_keepalive_connections=50,
+            keepalive_expiry=60.0,
+        ),
+    )
+    restore_reload_signal = _install_statsig_reload()
+    try:
+        await fetch_models(app.state.http)
+        aliases = get_claude_aliases()
+        logger.info(f'Loaded {len(aliases)} Claude aliases: {aliases}')
+        logger.info(f'Router ready on {config.host}:{config.port}')
+        if config.model_override:
+            logger.info(f'Model override: {config.model_override}')
+        yield
+    finally:
+        restore_reload_signal()
+        await app.state.http.aclose()
 
 
 app = FastAPI(
@@ -41,6 +71,7 @@ app = FastAPI(
     description='API proxy that translates Anthropic Claude API to OpenAI-compatible APIs',
     version='1.0.0',
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
@@ -80,9 +111,10 @@ async def messages(
         authorization: Optional Bearer token for API authentication.
 
     Returns
-        StreamingResponse for SSE or JSONResponse for non-streaming requests.
+        StreamingResponse for SSE or ORJSONResponse for non-streaming requests.
     """
-    body = await request.json()
+    body_bytes = await request.body()
+    body = orjson.loads(body_bytes)
 
     api_key = (
         config.openrouter_api_key
@@ -91,7 +123,7 @@ async def messages(
     )
 
     if not api_key:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=401,
             content={'error': {'message': 'API key required'}},
         )
@@ -110,30 +142,31 @@ async def messages(
         'X-Title': 'Open Claude Router',
     }
     url = f'{config.openrouter_base_url}/chat/completions'
+    client: httpx.AsyncClient = request.app.state.http
+    # Serialize once; httpx would otherwise re-encode the dict with stdlib json
+    payload = orjson.dumps(openai_request)
 
     if is_streaming:
         # Estimate input tokens for message_start event
         estimated_input_tokens = count_tokens(body)
 
-        async def generate():
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                async with client.stream(
-                    'POST',
-                    url,
-                    headers=headers,
-                    json=openai_request,
-                    timeout=300.0,
-                ) as response:
-                    if not response.is_success:
-                        error_text = await response.aread()
-                        logger.error(f'Upstream error {response.status_code}: {error_text.decode()[:200]}')
-                        yield f'data: {{"error": "{error_text.decode()}"}}\n\n'
-                        return
-
-                    async for chunk in stream_openai_to_anthropic(
-                        response, requested_model, estimated_input_tokens
-                    ):
-                        yield chunk
+        async def generate() -> AsyncIterator[bytes]:
+            async with client.stream(
+                'POST',
+                url,
+                headers=headers,
+                content=payload,
+            ) as response:
+                if not response.is_success:
+                    error_text = (await response.aread()).decode(errors='replace')
+                    logger.error(f'Upstream error {response.status_code}: {error_text[:200]}')
+                    yield b'data: ' + orjson.dumps({'error': error_text}) + b'\n\n'
+                    return
+
+                async for chunk in stream_openai_to_anthropic(
+                    response, requested_model, estimated_input_tokens
+                ):
+                    yield chunk
 
         return StreamingResponse(
             generate(),
@@ -144,28 +177,26 @@ async def messages(
             },
         )
     else:
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(
-                url,
-                headers=headers,
-                json=openai_request,
-                timeout=300.0,
-            )
+        response = await client.post(
+            url,
+            headers=headers,
+            content=payload,
+        )
 
-            if not response.is_success:
-                logger.error(f'Upstream error {response.status_code}: {response.text[:200]}')
-                return JSONResponse(
-                    status_code=response.status_code,
-                    content={'error': {'message': response.text}},
-                )
+        if not response.is_success:
+            logger.error(f'Upstream error {response.status_code}: {response.text[:200]}')
+            return ORJSONResponse(
+                status_code=response.status_code,
+                content={'error': {'message': response.text}},
+            )
 
-            openai_data = response.json()
-            anthropic_response = openai_to_anthropic(openai_data, requested_model)
-            return JSONResponse(content=anthropic_response)
+        openai_data = orjson.loads(response.content)
+        anthropic_response = openai_to_anthropic(openai_data, requested_model)
+        return ORJSONResponse(content=anthropic_response)
 
 
 @app.post('/v1/messages/count_tokens')
-async def count_tokens_endpoint(request: Request) -> JSONResponse:
+async def count_tokens_endpoint(request: Request) -> ORJSONResponse:
     """Estimate token count for an Anthropic-format request.
 
     Uses a heuristic of ~4 characters per token to provide a quick estimate
@@ -175,37 +206,32 @@ async def count_tokens_endpoint(request: Request) -> JSONResponse:
         request: FastAPI request containing Anthropic-format message body.
 
     Returns
-        JSONResponse with 'input_tokens' count.
+        ORJSONResponse with 'input_tokens' count.
     """
-    body = await request.json()
+    body = orjson.loads(await request.body())
     input_tokens = count_tokens(body)
-    return JSONResponse(content={'input_tokens': input_tokens})
+    return ORJSONResponse(content={'input_tokens': input_tokens})
 
 
 @app.get('/v1/models')
-async def list_models() -> JSONResponse:
+async def list_models() -> ORJSONResponse:
     """List available models in Anthropic format.
 
     Fetches models from OpenRouter and converts to Anthropic's format.
 
     Returns
-        JSONResponse with Anthropic-compatible models data structure.
+        ORJSONResponse with Anthropic-compatible models data structure.
     """
-    from datetime import datetime, timezone
-
-    from .models import get_models
-
     openrouter_models = await get_models()
 
     # Convert to Anthropic format
     anthropic_models = []
     for model in openrouter_models.get('data', []):
-        # Convert Unix timestamp to RFC 3339
-        created = model.get('created', 0)
-        if created:
-            created_at = datetime.fromtimestamp(created, tz=timezone.utc).isoformat()
-        else:
-            created_at = datetime.now(tz=timezone.utc).isoformat()
+        # RFC 3339 timestamp precomputed when the model index was built
+        created_at = (
+            model.get('_created_at_iso')
+            or datetime.now(tz=timezone.utc).isoformat()
+        )
 
         anthropic_models.append({
             'id': model.get('id', ''),
@@ -214,7 +240,7 @@ async def list_models() -> JSONResponse:
             'type': 'model',
         })
 
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         'data': anthropic_models,
         'has_more': False,
         'first_id': anthropic_models[0]['id'] if anthropic_models else None,
@@ -226,38 +252,75 @@ async def list_models() -> JSONResponse:
 # Statsig stub endpoints - bypass telemetry validation
 # ============================================================================
 
+@functools.cache
 def _load_statsig_response() -> dict | None:
-    """Load statsig response from bundled file or user cache."""
+    """Load statsig response from bundled file or user cache.
+
+    Memoized for the process lifetime; send SIGUSR1 to force a reload.
+    """
     # First try bundled response file
     if STATSIG_RESPONSE_FILE.exists():
         try:
-            with STATSIG_RESPONSE_FILE.open() as f:
-                return json.load(f)
+            return orjson.loads(STATSIG_RESPONSE_FILE.read_bytes())
         except Exception as e:
             logger.warning(f'Failed to load bundled statsig response: {e}')
 
-    # Fall back to user's cached evaluations
+    # Fall back to user's newest cached evaluations
     try:
-        for cache_file in STATSIG_CACHE_DIR.glob('statsig.cached.evaluations.*'):
-            with Path(cache_file).open() as f:
-                cached = json.load(f)
-                if 'data' in cached:
-                    return json.loads(cached['data'])
+        with os.scandir(STATSIG_CACHE_DIR) as it:
+            entries = [
+                e for e in it if e.name.startswith('statsig.cached.evaluations.')
+            ]
+        if entries:
+            newest = max(entries, key=lambda e: e.stat().st_mtime)
+            cached = orjson.loads(Path(newest.path).read_bytes())
+            if 'data' in cached:
+                return orjson.loads(cached['data'])
+    except FileNotFoundError:
+        pass
     except Exception as e:
         logger.warning(f'Failed to load statsig cache: {e}')
 
     return None
 
 
+def _reload_statsig_response(signum: int, frame) -> None:
+    """Drop the memoized statsig response so the next request reloads it."""
+    _load_statsig_response.cache_clear()
+    logger.info('Statsig response cache cleared')
+
+
+def _install_statsig_reload() -> Callable[[], None]:
+    """Hook `_RELOAD_SIGNAL` to the statsig reload; return a restore callback.
+
+    SIGHUP is left alone so a foreground server still exits on hangup.
+    Only the main thread may set handlers, so elsewhere this is a no-op.
+    """
+    if _RELOAD_SIGNAL is None or threading.current_thread() is not threading.main_thread():
+        return lambda: None
+
+    previous = signal.getsignal(_RELOAD_SIGNAL)
+
+    def handler(signum: int, frame) -> None:
+        _reload_statsig_response(signum, frame)
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(_RELOAD_SIGNAL, handler)
+    return lambda: signal.signal(
+        _RELOAD_SIGNAL, signal.SIG_DFL if previous is None else previous
+    )
+
+
 def _make_statsig_response(user: dict | None = None) -> dict:
     """Generate a valid statsig initialize response."""
     cached = _load_statsig_response()
     if cached:
-        # Update timestamp to current time
-        cached['time'] = int(time.time() * 1000)
+        # Copy so the memoized dict is never mutated; update timestamp
+        response = {**cached, 'time': int(time.time() * 1000)}
         if user:
-            cached['evaluated_keys'] = user
-        return cached
+            response['evaluated_keys'] = user
+        return response
 
     # Minimal valid response if no cache
     return {
@@ -274,33 +337,57 @@ def _make_statsig_response(user: dict | None = None) -> dict:
 
 
 @app.post('/v1/initialize')
-async def statsig_initialize(request: Request) -> JSONResponse:
+async def statsig_initialize(request: Request) -> ORJSONResponse:
     """Statsig initialize endpoint - returns feature flags."""
-    body = await request.json()
+    body = orjson.loads(await request.body())
     user = body.get('user', {})
     logger.info('Statsig initialize request (stubbed)')
-    return JSONResponse(content=_make_statsig_response(user))
+    return ORJSONResponse(content=_make_statsig_response(user))
 
 
-@app.post('/v1/log_event')
-async def statsig_log_event(request: Request) -> JSONResponse:
-    """Statsig log event endpoint - accepts and discards events."""
-    logger.debug('Statsig log_event request (stubbed)')
-    return JSONResponse(content={'success': True})
+class StatsigShortCircuitMiddleware:
+    """Answer fire-and-forget statsig endpoints before FastAPI routing.
 
+    Skips route matching and dependency resolution for log_event, rgstr and
+    get_id_lists; the request body is never read. /v1/initialize needs the
+    body and stays a regular route.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'http' and scope['method'] == 'POST':
+            stub = _STATSIG_STUBS.get(scope['path'])
+            if stub is not None:
+                logger.debug(f'Statsig {scope["path"]} request (stubbed)')
+                start, body = stub
+                await send(start)
+                await send(body)
+                return
+        await self.app(scope, receive, send)
+
+
+def _json_stub(body: bytes) -> tuple[dict, dict]:
+    """Build the ASGI start and body messages for a fixed JSON response."""
+    start = {
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+    }
+    return start, {'type': 'http.response.body', 'body': body}
 
-@app.post('/v1/rgstr')
-async def statsig_rgstr(request: Request) -> JSONResponse:
-    """Statsig register endpoint - accepts and discards."""
-    logger.debug('Statsig rgstr request (stubbed)')
-    return JSONResponse(content={'success': True})
 
+_STATSIG_STUBS = {
+    '/v1/log_event': _json_stub(_SUCCESS_BYTES),
+    '/v1/rgstr': _json_stub(_SUCCESS_BYTES),
+    '/v1/get_id_lists': _json_stub(_EMPTY_BYTES),
+}
 
-@app.post('/v1/get_id_lists')
-async def statsig_get_id_lists(request: Request) -> JSONResponse:
-    """Statsig ID lists endpoint."""
-    logger.debug('Statsig get_id_lists request (stubbed)')
-    return JSONResponse(content={})
+app.add_middleware(StatsigShortCircuitMiddleware)
 
 
 # ============================================================================
@@ -308,33 +395,27 @@ async def statsig_get_id_lists(request: Request) -> JSONResponse:
 # ============================================================================
 
 @app.get('/v1/models/{model_id}')
-async def get_model(model_id: str) -> JSONResponse:
+async def get_model(model_id: str) -> ORJSONResponse:
     """Get a specific model in Anthropic format."""
-    from datetime import datetime, timezone
-
-    from .models import get_models, map_model
-
-    openrouter_models = await get_models()
+    await get_models()
 
     # Find the model (also check mapped version)
-    mapped_id = map_model(model_id)
-    for model in openrouter_models.get('data', []):
-        if model.get('id') in {model_id, mapped_id}:
-            created = model.get('created', 0)
-            if created:
-                created_at = datetime.fromtimestamp(created, tz=timezone.utc).isoformat()
-            else:
-                created_at = datetime.now(tz=timezone.utc).isoformat()
-
-            return JSONResponse(content={
-                'id': model_id,  # Return the original requested ID, not OpenRouter's
-                'created_at': created_at,
-                'display_name': model.get('name', model.get('id', '')),
-                'type': 'model',
-            })
+    model = get_model_by_id(model_id) or get_model_by_id(map_model(model_id))
+    if model is not None:
+        created_at = (
+            model.get('_created_at_iso')
+            or datetime.now(tz=timezone.utc).isoformat()
+        )
+
+        return ORJSONResponse(content={
+            'id': model_id,  # Return the original requested ID, not OpenRouter's
+            'created_at': created_at,
+            'display_name': model.get('name', model.get('id', '')),
+            'type': 'model',
+        })
 
     # Return a synthetic model if not found (allows any model to be "valid")
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         'id': model_id,
         'created_at': datetime.now(tz=timezone.utc).isoformat(),
         'display_name': model_id,
@@ -343,10 +424,11 @@ async def get_model(model_id: str) -> JSONResponse:
 
 
 @app.api_route('/{path:path}', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
-async def catch_all(path: str, request: Request):
+async def catch_all(path: str, request: Request) -> Response:
     """Handle unimplemented endpoints gracefully."""
     logger.debug(f'Unhandled: {request.method} /{path}')
-    return JSONResponse(status_code=404, content={'error': {'message': f'Not found: /{path}'}})
+    body = _NOT_FOUND_PREFIX + orjson.dumps(f'Not found: /{path}') + b'}}'
+    return Response(body, status_code=404, media_type='application/json')
 
 
 def run() -> None:
@@ -355,7 +437,12 @@ def run() -> None:
         'src.main:app',
         host=config.host,
         port=config.port,
-        reload=True,
+        workers=config.workers,
+        reload=config.reload,
+        # 'auto' selects uvloop/httptools (uvicorn[standard]) when importable
+        loop='auto',
+        http='auto',
+        access_log=config.access_log,
     )
 
 
@@ -1,77 +1,113 @@
 """Model configuration and loading from OpenRouter API."""
 
+import functools
 import re
+from datetime import datetime, timezone
 
 import httpx
+import orjson
 
 OPENROUTER_MODELS_URL = 'https://openrouter.ai/api/v1/models'
 CLAUDE_TIERS = ('haiku', 'sonnet', 'opus')
 
-_cached_models: dict | None = None
-_claude_aliases: dict[str, str] | None = None
-_model_params: dict[str, set[str]] | None = None
+# Request keys forwarded to every model regardless of its supported_parameters
+ALWAYS_ALLOWED = frozenset({'model', 'messages', 'stream', 'stream_options'})
 
+_TIERS = '|'.join(CLAUDE_TIERS)
+_TIER_RE = re.compile(f'({_TIERS})', re.ASCII)
+# Alias candidates: Anthropic Claude IDs naming a tier
+_CLAUDE_ALIAS_RE = re.compile(f'anthropic/claude.*?(?i:({_TIERS}))', re.ASCII)
+# Variant suffixes (after the last ':') never chosen as an alias
+_BAD_SUFFIXES = frozenset({'free', 'beta', 'extended'})
 
-def _extract_claude_tier(model_id: str) -> str | None:
-    """Extract Claude tier (haiku/sonnet/opus) from a model ID.
-    """
-    model_id_lower = model_id.lower()
-    for tier in CLAUDE_TIERS:
-        if tier in model_id_lower:
-            return tier
-    return None
+_cached_models: dict | None = None
+_claude_aliases: dict[str, str] | None = None
+_model_params: dict[str, frozenset[str]] | None = None
+_model_index: dict[str, dict] | None = None
 
 
 def _build_claude_aliases(models_data: dict) -> dict[str, str]:
     """Build alias mapping from fetched models, selecting newest per tier.
     """
-    tier_candidates: dict[str, list[tuple[int, str]]] = {
-        tier: [] for tier in CLAUDE_TIERS
-    }
+    best: dict[str, tuple[int, str]] = {}
+    match = _CLAUDE_ALIAS_RE.match
 
     for model in models_data.get('data', []):
         model_id = model.get('id', '')
+        # Most of the catalogue is other vendors; reject those without the regex
         if not model_id.startswith('anthropic/claude'):
             continue
+        if model_id.rpartition(':')[2] in _BAD_SUFFIXES:
+            continue
+        m = match(model_id)
+        if m is None:
+            continue
 
-        tier = _extract_claude_tier(model_id)
-        if tier and not re.search(r':(free|beta|extended)', model_id):
-            created = model.get('created', 0)
-            tier_candidates[tier].append((created, model_id))
+        tier = m.group(1).lower()
+        candidate = (model.get('created', 0), model_id)
+        if tier not in best or candidate > best[tier]:
+            best[tier] = candidate
 
-    aliases: dict[str, str] = {}
-    for tier, candidates in tier_candidates.items():
-        if candidates:
-            candidates.sort(reverse=True)
-            aliases[tier] = candidates[0][1]
+    return {tier: model_id for tier, (_, model_id) in best.items()}
 
-    return aliases
 
+def _build_model_params(models_data: dict) -> dict[str, frozenset[str]]:
+    """Build mapping from model ID to the request keys it accepts.
 
-def _build_model_params(models_data: dict) -> dict[str, set[str]]:
-    """Build mapping from model ID to supported parameters."""
-    params: dict[str, set[str]] = {}
+    Each set is the model's supported parameters plus `ALWAYS_ALLOWED`.
+    """
+    params: dict[str, frozenset[str]] = {}
     for model in models_data.get('data', []):
         model_id = model.get('id', '')
         supported = model.get('supported_parameters', [])
         if model_id and supported:
-            params[model_id] = set(supported)
+            params[model_id] = frozenset(supported) | ALWAYS_ALLOWED
     return params
 
 
-async def fetch_models() -> dict:
+def _build_model_index(models_data: dict) -> dict[str, dict]:
+    """Build mapping from model ID to its model entry.
+
+    Also stores each entry's RFC 3339 creation time as `_created_at_iso`
+    (None if unknown) so endpoints don't reformat it per request.
+    """
+    index: dict[str, dict] = {}
+    for model in models_data.get('data', []):
+        created = model.get('created', 0)
+        model['_created_at_iso'] = (
+            datetime.fromtimestamp(created, tz=timezone.utc).isoformat()
+            if created else None
+        )
+        if model.get('id'):
+            index[model['id']] = model
+    return index
+
+
+async def fetch_models(client: httpx.AsyncClient | None = None) -> dict:
     """Fetch models from OpenRouter API and build Claude aliases.
+
+    Uses the given shared client when provided, otherwise a one-off client.
     """
-    global _cached_models, _claude_aliases, _model_params
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(OPENROUTER_MODELS_URL)
-        response.raise_for_status()
-        _cached_models = response.json()
+    global _cached_models, _claude_aliases, _model_params, _model_index
+    if client is None:
+        async with httpx.AsyncClient(timeout=30.0) as one_off:
+            response = await one_off.get(OPENROUTER_MODELS_URL)
+    else:
+        response = await client.get(OPENROUTER_MODELS_URL, timeout=30.0)
+    response.raise_for_status()
+    _cached_models = orjson.loads(response.content)
     _claude_aliases = _build_claude_aliases(_cached_models)
     _model_params = _build_model_params(_cached_models)
+    _model_index = _build_model_index(_cached_models)
+    _reset_model_cache()
     return _cached_models
 
 
+def _reset_model_cache() -> None:
+    """Drop lookups derived from the previous model list."""
+    map_model.cache_clear()
+
+
 async def get_models() -> dict:
     """Get models (from memory cache or fetch from API).
     """
@@ -96,30 +132,36 @@ def get_model_ids() -> set[str]:
     return {m['id'] for m in _cached_models.get('data', [])}
 
 
-def get_supported_params(model_id: str) -> set[str] | None:
-    """Get supported parameters for a model (sync, uses cache only).
+def get_model_by_id(model_id: str) -> dict | None:
+    """Get a model entry by its OpenRouter ID (sync, uses cache only).
+    """
+    if _model_index is None:
+        return None
+    return _model_index.get(model_id)
+
 
-    Returns None if model not found, empty set if no params listed.
+def get_supported_params(model_id: str) -> frozenset[str] | None:
+    """Get request keys accepted by a model (sync, uses cache only).
+
+    Includes `ALWAYS_ALLOWED`. Returns None if model not found.
     """
     if _model_params is None:
         return None
     return _model_params.get(model_id)
 
 
+@functools.lru_cache(maxsize=512)
 def map_model(anthropic_model: str) -> str:
     """Map Anthropic model names to OpenRouter model IDs.
 
     Handles three cases: OpenRouter IDs (contain '/'), Claude aliases
     (haiku/sonnet/opus mapped to newest versions), and passthrough for
-    unrecognized models.
+    unrecognized models. Results are cached until the next `fetch_models()`.
     """
     if '/' in anthropic_model:
         return anthropic_model
 
-    model_lower = anthropic_model.lower()
-    aliases = get_claude_aliases()
-    for tier in CLAUDE_TIERS:
-        if tier in model_lower and tier in aliases:
-            return aliases[tier]
-
+    m = _TIER_RE.search(anthropic_model.lower())
+    if m and _claude_aliases:
+        return _claude_aliases.get(m.group(1), anthropic_model)
     return anthropic_model
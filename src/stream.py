@@ -1,23 +1,91 @@
 """Streaming SSE transformation from OpenAI to Anthropic format."""
 
-import json
 import logging
 import time
 from collections.abc import AsyncIterator
 
 import httpx
+import orjson
 
-logger = logging.getLogger('uvicorn.error')
+from .transform import FINISH_REASON_MAP
 
+logger = logging.getLogger('uvicorn.error')
 
-def _sse_event(event_type: str, data: dict) -> str:
+_DATA_PREFIX = b'data: '
+_DATA_PREFIX_LEN = len(_DATA_PREFIX)
+
+# Constant frames, prebuilt in the same compact form orjson produces
+_MSG_STOP = b'event: message_stop\ndata: {"type":"message_stop"}\n\n'
+_BLOCK_STOP_FMT = (
+    b'event: content_block_stop\n'
+    b'data: {"type":"content_block_stop","index":%d}\n\n'
+)
+# Per-token deltas: only the JSON-encoded payload string varies
+_TEXT_DELTA_FMT = (
+    b'event: content_block_delta\n'
+    b'data: {"type":"content_block_delta","index":%d,'
+    b'"delta":{"type":"text_delta","text":%s}}\n\n'
+)
+_THINKING_DELTA_FMT = (
+    b'event: content_block_delta\n'
+    b'data: {"type":"content_block_delta","index":%d,'
+    b'"delta":{"type":"thinking_delta","thinking":%s}}\n\n'
+)
+_INPUT_JSON_DELTA_FMT = (
+    b'event: content_block_delta\n'
+    b'data: {"type":"content_block_delta","index":%d,'
+    b'"delta":{"type":"input_json_delta","partial_json":%s}}\n\n'
+)
+
+# Kind of the currently open content block
+_NO_BLOCK, _TEXT, _THINKING, _TOOL = range(4)
+
+
+# Pre-encoded 'event: ...\ndata: ' heads for every Anthropic stream event
+_EVENT_PREFIXES = {
+    event_type: b'event: %s\ndata: ' % event_type.encode()
+    for event_type in (
+        'message_start',
+        'content_block_start',
+        'content_block_delta',
+        'content_block_stop',
+        'message_delta',
+        'message_stop',
+    )
+}
+
+
+def _sse_event(event_type: str, data: dict) -> bytes:
     """Format a server-sent event."""
-    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+    return _EVENT_PREFIXES[event_type] + orjson.dumps(data) + b'\n\n'
+
+
+def _close_block(frames: list[bytes], block: int, index: int) -> int:
+    """Close the open content block, if any, and return the next block index."""
+    if block == _NO_BLOCK:
+        return index
+    frames.append(_BLOCK_STOP_FMT % index)
+    return index + 1
+
+
+async def _aiter_lines(response: httpx.Response) -> AsyncIterator[bytes]:
+    """Split the raw upstream byte stream into lines, without line endings."""
+    buf = bytearray()
+    async for chunk in response.aiter_bytes():
+        buf += chunk
+        start = 0
+        while (end := buf.find(b'\n', start)) != -1:
+            line_end = end - 1 if end > start and buf[end - 1] == 0x0D else end
+            yield bytes(buf[start:line_end])
+            start = end + 1
+        del buf[:start]
+    if buf:
+        yield bytes(buf)
 
 
 async def stream_openai_to_anthropic(
     response: httpx.Response, model: str, input_tokens: int = 0
-) -> AsyncIterator[str]:
+) -> AsyncIterator[bytes]:
     """Transform OpenAI streaming response to Anthropic SSE format.
 
     Args:
@@ -25,7 +93,7 @@ async def stream_openai_to_anthropic(
         model: The model name to include in the response
         input_tokens: Estimated input token count for message_start
     """
-    message_id = f'msg_{int(time.time() * 1000)}'
+    message_id = f'msg_{time.time_ns() // 1_000_000}'
 
     yield _sse_event('message_start', {
         'type': 'message_start',
@@ -47,60 +115,70 @@ async def stream_openai_to_anthropic(
     })
 
     content_block_index = 0
-    has_started_text_block = False
-    has_started_thinking_block = False
-    is_tool_use = False
+    block = _NO_BLOCK
     current_tool_call_id: str | None = None
-    tool_call_json: dict[str, str] = {}
     usage: dict[str, int] = {}
+    finish_reason: str | None = None
 
-    def close_current_block() -> str:
-        """Generate content_block_stop event."""
-        return _sse_event('content_block_stop', {
-            'type': 'content_block_stop',
-            'index': content_block_index,
-        })
-
-    async for line in response.aiter_lines():
-        if not line or not line.startswith('data: '):
+    async for line in _aiter_lines(response):
+        # Slice compare: shorter lines (blank, 'data:') just fail to match
+        if line[:_DATA_PREFIX_LEN] != _DATA_PREFIX:
             continue
 
-        data_str = line[6:].strip()
-        if data_str == '[DONE]':
+        # Line endings are already removed; orjson tolerates other whitespace
+        data = line[_DATA_PREFIX_LEN:]
+        if data == b'[DONE]':
             continue
 
         try:
-            parsed = json.loads(data_str)
-        except json.JSONDecodeError:
+            parsed = orjson.loads(data)
+        except orjson.JSONDecodeError:
             continue
 
+        choices = parsed.get('choices')
+        choice = choices[0] if choices else None
+        delta = choice.get('delta') if choice else None
+
+        # Usage may ride on any frame, including one with an empty content delta
         if parsed.get('usage'):
             usage = parsed['usage']
-
-        choices = parsed.get('choices', [])
-        if not choices:
-            continue
-
-        delta = choices[0].get('delta', {})
+        if choice and choice.get('finish_reason'):
+            finish_reason = choice['finish_reason']
         if not delta:
             continue
 
-        if delta.get('tool_calls'):
+        # Events produced by one upstream line go out in a single write
+        frames: list[bytes] = []
+
+        # Text is checked first since most frames carry it; tool calls and
+        # reasoning still win whenever they are present alongside content
+        if not (delta.get('tool_calls') or delta.get('reasoning')):
+            text = delta.get('content')
+            if not text:
+                continue
+
+            if block != _TEXT:
+                content_block_index = _close_block(frames, block, content_block_index)
+                block = _TEXT
+                current_tool_call_id = None
+                frames.append(_sse_event('content_block_start', {
+                    'type': 'content_block_start',
+                    'index': content_block_index,
+                    'content_block': {'type': 'text', 'text': ''},
+                }))
+
+            frames.append(_TEXT_DELTA_FMT % (content_block_index, orjson.dumps(text)))
+
+        elif delta.get('tool_calls'):
             for tool_call in delta['tool_calls']:
                 tool_call_id = tool_call.get('id')
 
                 if tool_call_id and tool_call_id != current_tool_call_id:
-                    if is_tool_use or has_started_text_block or has_started_thinking_block:
-                        yield close_current_block()
-
-                    is_tool_use = True
-                    has_started_text_block = False
-                    has_started_thinking_block = False
+                    content_block_index = _close_block(frames, block, content_block_index)
+                    block = _TOOL
                     current_tool_call_id = tool_call_id
-                    content_block_index += 1
-                    tool_call_json[tool_call_id] = ''
 
-                    yield _sse_event('content_block_start', {
+                    frames.append(_sse_event('content_block_start', {
                         'type': 'content_block_start',
                         'index': content_block_index,
                         'content_block': {
@@ -109,30 +187,20 @@ async def stream_openai_to_anthropic(
                             'name': tool_call.get('function', {}).get('name'),
                             'input': {},
                         },
-                    })
+                    }))
 
                 func_args = tool_call.get('function', {}).get('arguments')
                 if func_args and current_tool_call_id:
-                    tool_call_json[current_tool_call_id] += func_args
-                    yield _sse_event('content_block_delta', {
-                        'type': 'content_block_delta',
-                        'index': content_block_index,
-                        'delta': {
-                            'type': 'input_json_delta',
-                            'partial_json': func_args,
-                        },
-                    })
-
-        elif delta.get('reasoning'):
-            if is_tool_use or has_started_text_block:
-                yield close_current_block()
-                is_tool_use = False
-                has_started_text_block = False
+                    frames.append(_INPUT_JSON_DELTA_FMT % (
+                        content_block_index, orjson.dumps(func_args),
+                    ))
+
+        else:
+            if block != _THINKING:
+                content_block_index = _close_block(frames, block, content_block_index)
+                block = _THINKING
                 current_tool_call_id = None
-                content_block_index += 1
-
-            if not has_started_thinking_block:
-                yield _sse_event('content_block_start', {
+                frames.append(_sse_event('content_block_start', {
                     'type': 'content_block_start',
                     'index': content_block_index,
                     'content_block': {
@@ -140,45 +208,18 @@ async def stream_openai_to_anthropic(
                         'thinking': '',
                         'signature': 'openrouter-reasoning',
                     },
-                })
-                has_started_thinking_block = True
-
-            yield _sse_event('content_block_delta', {
-                'type': 'content_block_delta',
-                'index': content_block_index,
-                'delta': {
-                    'type': 'thinking_delta',
-                    'thinking': delta['reasoning'],
-                },
-            })
-
-        elif delta.get('content'):
-            if is_tool_use or has_started_thinking_block:
-                yield close_current_block()
-                is_tool_use = False
-                has_started_thinking_block = False
-                current_tool_call_id = None
-                content_block_index += 1
+                }))
 
-            if not has_started_text_block:
-                yield _sse_event('content_block_start', {
-                    'type': 'content_block_start',
-                    'index': content_block_index,
-                    'content_block': {'type': 'text', 'text': ''},
-                })
-                has_started_text_block = True
+            frames.append(_THINKING_DELTA_FMT % (
+                content_block_index, orjson.dumps(delta['reasoning']),
+            ))
 
-            yield _sse_event('content_block_delta', {
-                'type': 'content_block_delta',
-                'index': content_block_index,
-                'delta': {
-                    'type': 'text_delta',
-                    'text': delta['content'],
-                },
-            })
+        if frames:
+            yield b''.join(frames)
 
-    if is_tool_use or has_started_text_block or has_started_thinking_block:
-        yield close_current_block()
+    frames = []
+    if block:
+        frames.append(_BLOCK_STOP_FMT % content_block_index)
 
     output_tokens = usage.get('completion_tokens', 0)
     final_input_tokens = usage.get('prompt_tokens', input_tokens)
@@ -186,7 +227,9 @@ async def stream_openai_to_anthropic(
     message_delta_event = {
         'type': 'message_delta',
         'delta': {
-            'stop_reason': 'tool_use' if is_tool_use else 'end_turn',
+            'stop_reason': (
+                'tool_use' if block == _TOOL else FINISH_REASON_MAP.get(finish_reason, 'end_turn')
+            ),
             'stop_sequence': None,
         },
         'usage': {
@@ -194,5 +237,6 @@ async def stream_openai_to_anthropic(
             'output_tokens': output_tokens,
         },
     }
-    yield _sse_event('message_delta', message_delta_event)
-    yield _sse_event('message_stop', {'type': 'message_stop'})
+    frames.append(_sse_event('message_delta', message_delta_event))
+    frames.append(_MSG_STOP)
+    yield b''.join(frames)
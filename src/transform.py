@@ -1,129 +1,112 @@
 """Transform requests/responses between Anthropic and OpenAI formats."""
 
-import json
 import logging
+import operator
 import time
+from collections.abc import Iterator
 from typing import Any
 
+import orjson
+
 from .models import get_supported_params, map_model
 
 logger = logging.getLogger('uvicorn.error')
 
 
+def _emit_tool_turn(
+    validated: list[dict], assistant: dict, results: list[dict]
+) -> None:
+    """Append an assistant turn keeping only tool_calls answered by results."""
+    answered = {m.get('tool_call_id') for m in results}
+    current = assistant.copy()
+    valid_calls = [tc for tc in current['tool_calls'] if tc.get('id') in answered]
+
+    if valid_calls:
+        current['tool_calls'] = valid_calls
+    else:
+        del current['tool_calls']
+
+    if current.get('content') or current.get('tool_calls'):
+        validated.append(current)
+    validated.extend(results)
+
+
 def _validate_tool_calls(messages: list[dict]) -> list[dict]:
     """Validate OpenAI messages to ensure complete tool_calls/tool pairing.
 
     Requires tool messages to immediately follow assistant messages with tool_calls.
+    Runs in one forward pass: an assistant with tool_calls is held back until
+    the run of tool messages after it ends.
     """
     validated: list[dict] = []
+    pending: dict | None = None
+    pending_ids: set[str | None] = set()
+    results: list[dict] = []
+
+    for msg in messages:
+        role = msg.get('role')
+        if role == 'tool':
+            if pending is not None and msg.get('tool_call_id') in pending_ids:
+                results.append(msg)
+            continue
 
-    for i, msg in enumerate(messages):
-        current = msg.copy()
-
-        if current.get('role') == 'assistant' and current.get('tool_calls'):
-            immediate_tool_msgs: list[dict] = []
-            j = i + 1
-            while j < len(messages) and messages[j].get('role') == 'tool':
-                immediate_tool_msgs.append(messages[j])
-                j += 1
-
-            tool_msg_ids = {m.get('tool_call_id') for m in immediate_tool_msgs}
-            valid_calls = [
-                tc for tc in current['tool_calls'] if tc.get('id') in tool_msg_ids
-            ]
-
-            if valid_calls:
-                current['tool_calls'] = valid_calls
-            else:
-                del current['tool_calls']
-
-            if current.get('content') or current.get('tool_calls'):
-                validated.append(current)
-
-        elif current.get('role') == 'tool':
-            has_match = False
-            if i > 0:
-                for k in range(i - 1, -1, -1):
-                    prev = messages[k]
-                    if prev.get('role') == 'tool':
-                        continue
-                    if prev.get('role') == 'assistant' and prev.get('tool_calls'):
-                        has_match = any(
-                            tc.get('id') == current.get('tool_call_id')
-                            for tc in prev['tool_calls']
-                        )
-                    break
-
-            if has_match:
-                validated.append(current)
+        if pending is not None:
+            _emit_tool_turn(validated, pending, results)
+            pending = None
+
+        if role == 'assistant' and msg.get('tool_calls'):
+            pending = msg
+            pending_ids = {tc.get('id') for tc in msg['tool_calls']}
+            results = []
         else:
-            validated.append(current)
+            validated.append(msg)
+
+    if pending is not None:
+        _emit_tool_turn(validated, pending, results)
 
     return validated
 
 
-ALWAYS_ALLOWED = {'model', 'messages', 'stream', 'stream_options'}
+# Sampling params whose name and meaning match in both APIs
+_PASSTHROUGH_KEYS = ('temperature', 'max_tokens', 'top_p', 'top_k')
+
+# Anthropic tool_choice types that map to a fixed OpenAI value
+_TOOL_CHOICE_MAP = {'auto': 'auto', 'any': 'required'}
+
+# Shared by every system block; requests are only serialized, never mutated
+_CACHE_CONTROL = {'type': 'ephemeral'}
 
 
 def _filter_unsupported_params(request: dict, model: str) -> dict:
     """Filter request to only include parameters supported by the model.
 
-    Always keeps 'model', 'messages', 'stream'. Other params are filtered
-    based on OpenRouter's supported_parameters for that model.
+    Always keeps `ALWAYS_ALLOWED` keys. Other params are filtered based on
+    OpenRouter's supported_parameters for that model.
     """
-    supported = get_supported_params(model)
-    if supported is None:
+    allowed = get_supported_params(model)
+    if allowed is None:
         return request  # Model not in cache, pass through
 
-    filtered = {}
-    dropped = []
-    for key, value in request.items():
-        if key in ALWAYS_ALLOWED or key in supported:
-            filtered[key] = value
-        else:
-            dropped.append(key)
-    if dropped:
+    filtered = {k: v for k, v in request.items() if k in allowed}
+    if len(filtered) != len(request):
+        dropped = [k for k in request if k not in allowed]
         logger.info(f'Filtered unsupported params for {model}: {dropped}')
     return filtered
 
 
-def anthropic_to_openai(body: dict, model_override: str | None = None) -> dict:
-    """Convert Anthropic API request to OpenAI format."""
-    model = model_override or map_model(body.get('model', ''))
-    messages = body.get('messages', [])
-    system = body.get('system', [])
-    tools = body.get('tools')
-    stream = body.get('stream', False)
-    temperature = body.get('temperature')
-    reasoning = body.get('reasoning')
-    reasoning_effort = body.get('reasoning_effort')
-    thinking = body.get('thinking')
-    max_tokens = body.get('max_tokens')
-    top_p = body.get('top_p')
-    top_k = body.get('top_k')
-    stop_sequences = body.get('stop_sequences')
-    tool_choice = body.get('tool_choice')
-
-    system_messages: list[dict] = []
-    if isinstance(system, str):
-        content: list[dict[str, Any]] = [{'type': 'text', 'text': system}]
-        if 'claude' in model:
-            content[0]['cache_control'] = {'type': 'ephemeral'}
-        system_messages.append({'role': 'system', 'content': content})
-    elif isinstance(system, list):
-        for item in system:
-            content = [{'type': 'text', 'text': item.get('text', '')}]
-            if 'claude' in model:
-                content[0]['cache_control'] = {'type': 'ephemeral'}
-            system_messages.append({'role': 'system', 'content': content})
+def _convert_messages(messages: list[dict]) -> list[dict]:
+    """Convert Anthropic messages (content blocks) to OpenAI messages.
 
+    The result still needs `_validate_tool_calls` before sending upstream.
+    """
     openai_messages: list[dict] = []
     for msg in messages:
         role = msg.get('role')
         content = msg.get('content')
 
-        if not isinstance(content, list):
-            if isinstance(content, str):
+        # Bodies come from orjson, so content values are never subclasses
+        if type(content) is not list:
+            if type(content) is str:
                 openai_messages.append({'role': role, 'content': content})
             continue
 
@@ -131,18 +114,21 @@ def anthropic_to_openai(body: dict, model_override: str | None = None) -> dict:
             assistant_msg: dict[str, Any] = {'role': 'assistant', 'content': None}
             text_parts: list[str] = []
             tool_calls: list[dict] = []
+            text_append = text_parts.append
+            tc_append = tool_calls.append
 
             for part in content:
-                if part.get('type') == 'text':
+                ptype = part.get('type')
+                if ptype == 'text':
                     text = part.get('text', '')
-                    text_parts.append(text if isinstance(text, str) else json.dumps(text))
-                elif part.get('type') == 'tool_use':
-                    tool_calls.append({
+                    text_append(text if isinstance(text, str) else orjson.dumps(text).decode())
+                elif ptype == 'tool_use':
+                    tc_append({
                         'id': part.get('id'),
                         'type': 'function',
                         'function': {
                             'name': part.get('name'),
-                            'arguments': json.dumps(part.get('input', {})),
+                            'arguments': orjson.dumps(part.get('input', {})).decode(),
                         },
                     })
 
@@ -157,18 +143,21 @@ def anthropic_to_openai(body: dict, model_override: str | None = None) -> dict:
         elif role == 'user':
             text_parts = []
             tool_results: list[dict] = []
+            text_append = text_parts.append
+            tr_append = tool_results.append
 
             for part in content:
-                if part.get('type') == 'text':
+                ptype = part.get('type')
+                if ptype == 'text':
                     text = part.get('text', '')
-                    text_parts.append(text if isinstance(text, str) else json.dumps(text))
-                elif part.get('type') == 'tool_result':
+                    text_append(text if isinstance(text, str) else orjson.dumps(text).decode())
+                elif ptype == 'tool_result':
                     result_content = part.get('content', '')
-                    tool_results.append({
+                    tr_append({
                         'role': 'tool',
                         'tool_call_id': part.get('tool_use_id'),
                         'content': result_content if isinstance(result_content, str)
-                        else json.dumps(result_content),
+                        else orjson.dumps(result_content).decode(),
                     })
 
             text_content = '\n'.join(text_parts).strip()
@@ -176,27 +165,84 @@ def anthropic_to_openai(body: dict, model_override: str | None = None) -> dict:
                 openai_messages.append({'role': 'user', 'content': text_content})
             openai_messages.extend(tool_results)
 
+    return openai_messages
+
+
+_PLAIN_ROLES = frozenset({'user', 'assistant'})
+
+
+def _is_plain_chat(messages: list[dict]) -> bool:
+    """Check whether every message is a user/assistant turn with string content.
+
+    Such histories translate one-to-one and need no tool-call validation.
+    """
+    return all(
+        type(m.get('content')) is str and m.get('role') in _PLAIN_ROLES
+        for m in messages
+    )
+
+
+def _system_message(text: str, cache: bool) -> dict:
+    """Build one OpenAI system message, marked cacheable for Claude models."""
+    block: dict[str, Any] = {'type': 'text', 'text': text}
+    if cache:
+        block['cache_control'] = _CACHE_CONTROL
+    return {'role': 'system', 'content': [block]}
+
+
+def _has_tool_turns(messages: list[dict]) -> bool:
+    """Check whether converted messages carry tool calls or tool results.
+
+    Without either there is nothing for `_validate_tool_calls` to pair up.
+    """
+    return any('tool_calls' in m or m['role'] == 'tool' for m in messages)
+
+
+def anthropic_to_openai(body: dict, model_override: str | None = None) -> dict:
+    """Convert Anthropic API request to OpenAI format."""
+    model = model_override or map_model(body.get('model', ''))
+    messages = body.get('messages', [])
+    system = body.get('system', [])
+    tools = body.get('tools')
+    stream = body.get('stream', False)
+    reasoning = body.get('reasoning')
+    reasoning_effort = body.get('reasoning_effort')
+    thinking = body.get('thinking')
+    stop_sequences = body.get('stop_sequences')
+    tool_choice = body.get('tool_choice')
+
+    is_claude = 'claude' in model
+    # System prompts and the conversation are written into one list
+    out_messages: list[dict] = []
     result: dict[str, Any] = {
         'model': model,
-        'messages': system_messages + _validate_tool_calls(openai_messages),
+        'messages': out_messages,
         'stream': stream,
     }
 
+    if type(system) is str:
+        out_messages.append(_system_message(system, is_claude))
+    elif type(system) is list and system:
+        out_messages.extend(
+            _system_message(item.get('text', ''), is_claude) for item in system
+        )
+
+    # String-only histories skip block translation and tool-call validation
+    if _is_plain_chat(messages):
+        out_messages += [{'role': m['role'], 'content': m['content']} for m in messages]
+    else:
+        conversation = _convert_messages(messages)
+        if _has_tool_turns(conversation):
+            conversation = _validate_tool_calls(conversation)
+        out_messages.extend(conversation)
+
     # Request usage stats in streaming responses
     if stream:
         result['stream_options'] = {'include_usage': True}
 
-    if temperature is not None:
-        result['temperature'] = temperature
-
-    if max_tokens is not None:
-        result['max_tokens'] = max_tokens
-
-    if top_p is not None:
-        result['top_p'] = top_p
-
-    if top_k is not None:
-        result['top_k'] = top_k
+    result.update(
+        (key, body[key]) for key in _PASSTHROUGH_KEYS if body.get(key) is not None
+    )
 
     if stop_sequences:
         result['stop'] = stop_sequences
@@ -212,15 +258,13 @@ def anthropic_to_openai(body: dict, model_override: str | None = None) -> dict:
     if tool_choice:
         if isinstance(tool_choice, dict):
             tc_type = tool_choice.get('type')
-            if tc_type == 'auto':
-                result['tool_choice'] = 'auto'
-            elif tc_type == 'any':
-                result['tool_choice'] = 'required'
+            if tc_type in _TOOL_CHOICE_MAP:
+                result['tool_choice'] = _TOOL_CHOICE_MAP[tc_type]
             elif tc_type == 'tool':
                 result['tool_choice'] = {
                     'type': 'function',
                     'function': {'name': tool_choice.get('name')},
-                    }
+                }
         else:
             result['tool_choice'] = tool_choice
 
@@ -240,30 +284,47 @@ def anthropic_to_openai(body: dict, model_override: str | None = None) -> dict:
     return _filter_unsupported_params(result, model)
 
 
+# OpenAI finish_reason -> Anthropic stop_reason; anything else ends the turn
+FINISH_REASON_MAP = {
+    'stop': 'end_turn',
+    'tool_calls': 'tool_use',
+    'length': 'max_tokens',
+    'content_filter': 'refusal',
+}
+
+
 def openai_to_anthropic(data: dict, model: str) -> dict:
     """Convert OpenAI API response to Anthropic format."""
-    message_id = f'msg_{int(time.time() * 1000)}'
+    message_id = f'msg_{time.time_ns() // 1_000_000}'
     choice = data.get('choices', [{}])[0]
     message = choice.get('message', {})
 
-    content: list[dict] = []
+    reasoning = message.get('reasoning')
+    tool_calls = message.get('tool_calls')
+    text = message.get('content')
 
-    if message.get('reasoning'):
-        content.append({
-            'type': 'thinking',
-            'thinking': message['reasoning'],
-            'signature': 'openrouter-reasoning',
-        })
+    # Plain text replies (the common case) skip the block-by-block assembly
+    if not (reasoning or tool_calls):
+        content = [{'type': 'text', 'text': text}] if text else []
+    else:
+        content = []
+        if reasoning:
+            content.append({
+                'type': 'thinking',
+                'thinking': reasoning,
+                'signature': 'openrouter-reasoning',
+            })
 
-    if message.get('content'):
-        content.append({'type': 'text', 'text': message['content']})
+        if text:
+            content.append({'type': 'text', 'text': text})
 
-    if message.get('tool_calls'):
-        for tc in message['tool_calls']:
+        for tc in tool_calls or ():
             func = tc.get('function', {})
+            args = func.get('arguments')
             try:
-                input_data = json.loads(func.get('arguments', '{}'))
-            except json.JSONDecodeError:
+                # Argument-less calls often arrive as '' or null; skip the parse
+                input_data = orjson.loads(args) if args else {}
+            except orjson.JSONDecodeError:
                 input_data = {}
 
             content.append({
@@ -275,8 +336,6 @@ def openai_to_anthropic(data: dict, model: str) -> dict:
 
     usage = data.get('usage', {})
     finish_reason = choice.get('finish_reason', '')
-    has_tool_calls = finish_reason == 'tool_calls' or message.get('tool_calls')
-    stop_reason = 'tool_use' if has_tool_calls else 'end_turn'
 
     return {
         'id': message_id,
@@ -284,7 +343,9 @@ def openai_to_anthropic(data: dict, model: str) -> dict:
         'role': 'assistant',
         'content': content,
         'model': model,
-        'stop_reason': stop_reason,
+        'stop_reason': (
+            'tool_use' if tool_calls else FINISH_REASON_MAP.get(finish_reason, 'end_turn')
+        ),
         'stop_sequence': None,
         'usage': {
             'input_tokens': usage.get('prompt_tokens', 0),
@@ -293,21 +354,25 @@ def openai_to_anthropic(data: dict, model: str) -> dict:
     }
 
 
-def count_tokens(body: dict) -> int:
-    """Estimate token count from request body (~4 chars per token)."""
-    char_count = 0
+_get_text = operator.methodcaller('get', 'text', '')
+
+
+def _text_chars(value: Any) -> int:
+    """Count characters in a string or a list of `{'text': ...}` blocks."""
+    if type(value) is str:
+        return len(value)
+    if type(value) is list:
+        return sum(map(len, map(_get_text, value)))
+    return 0
 
-    system = body.get('system')
-    if isinstance(system, str):
-        char_count += len(system)
-    elif isinstance(system, list):
-        char_count += sum(len(s.get('text', '')) for s in system)
 
+def _iter_lens(body: dict) -> Iterator[int]:
+    """Yield the text length of the system prompt and of each message."""
+    yield _text_chars(body.get('system'))
     for msg in body.get('messages', []):
-        content = msg.get('content')
-        if isinstance(content, str):
-            char_count += len(content)
-        elif isinstance(content, list):
-            char_count += sum(len(p.get('text', '')) for p in content)
+        yield _text_chars(msg.get('content'))
+
 
-    return (char_count + 3) // 4  # ceil division
+def count_tokens(body: dict) -> int:
+    """Estimate token count from request body (~4 chars per token)."""
+    return (sum(_iter_lens(body)) + 3) >> 2  # ceil division by 4
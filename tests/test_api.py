@@ -1,6 +1,10 @@
 """Integration tests for API endpoints."""
 
 import json
+import signal
+import subprocess
+import sys
+from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -14,12 +18,14 @@ from src.main import app
 def mock_claude_aliases():
     """Populate Claude aliases cache for testing.
     """
+    models_module._reset_model_cache()
     models_module._claude_aliases = {
         'haiku': 'anthropic/claude-haiku-4.5',
         'sonnet': 'anthropic/claude-sonnet-4.5',
         'opus': 'anthropic/claude-opus-4.5',
     }
     yield
+    models_module._reset_model_cache()
     models_module._claude_aliases = None
 
 
@@ -28,13 +34,32 @@ class TestStartupLifespan:
 
     def test_fetch_models_called_on_startup(self):
         """Verify fetch_models is called during app lifespan startup."""
-        with patch.object(
-            models_module, 'fetch_models', new_callable=AsyncMock
+        with patch(
+            'src.main.fetch_models', new_callable=AsyncMock
         ) as mock_fetch:
             with TestClient(app):
                 pass
             mock_fetch.assert_called_once()
 
+    def test_shared_http_client_lifecycle(self):
+        """Verify the upstream client is reused and closed on shutdown."""
+        with patch(
+            'src.main.fetch_models', new_callable=AsyncMock
+        ) as mock_fetch:
+            with TestClient(app):
+                http = app.state.http
+                assert not http.is_closed
+                mock_fetch.assert_called_once_with(http)
+            assert http.is_closed
+
+    def test_http_client_closed_when_startup_fails(self):
+        with patch(
+            'src.main.fetch_models', new_callable=AsyncMock, side_effect=RuntimeError('boom')
+        ), pytest.raises(RuntimeError):
+            with TestClient(app):
+                pass
+        assert app.state.http.is_closed
+
     def test_aliases_populated_after_startup(self, httpx_mock: HTTPXMock):
         """Verify Claude aliases are available after startup."""
         # Clear the cache to simulate fresh startup
@@ -69,9 +94,12 @@ class TestStartupLifespan:
 
 @pytest.fixture
 def client():
-    """Create test client.
+    """Create test client with lifespan (shared upstream client) running.
     """
-    return TestClient(app)
+    with patch(
+        'src.main.fetch_models', new_callable=AsyncMock
+    ), TestClient(app) as test_client:
+        yield test_client
 
 
 class TestHealthEndpoint:
@@ -304,3 +332,177 @@ class TestStreamingEndpoint:
         content = response.text
         assert 'event: message_start' in content
         assert 'event: message_stop' in content
+
+    def test_streaming_upstream_error_is_valid_json(self, client, httpx_mock: HTTPXMock):
+        """Upstream error text with quotes is escaped in the SSE payload."""
+        httpx_mock.add_response(
+            url='https://openrouter.ai/api/v1/chat/completions',
+            status_code=400,
+            text='{"message": "bad \\"model\\""}',
+        )
+
+        response = client.post(
+            '/v1/messages',
+            headers={'X-Api-Key': 'test-key'},
+            json={
+                'model': 'claude-3-5-sonnet',
+                'messages': [{'role': 'user', 'content': 'Hello'}],
+                'stream': True,
+            },
+        )
+
+        line = response.text.strip()
+        assert line.startswith('data: ')
+        payload = json.loads(line.removeprefix('data: '))
+        assert payload['error'] == '{"message": "bad \\"model\\""}'
+
+
+class TestStubEndpoints:
+    """Tests for statsig stubs and the catch-all handler."""
+
+    def test_statsig_initialize_is_memoized(self, client):
+        from src.main import _load_statsig_response
+
+        _load_statsig_response.cache_clear()
+        first = client.post('/v1/initialize', json={'user': {'userID': 'a'}})
+        second = client.post('/v1/initialize', json={'user': {'userID': 'b'}})
+        assert first.status_code == second.status_code == 200
+        assert second.json()['evaluated_keys'] == {'userID': 'b'}
+        assert _load_statsig_response.cache_info().misses == 1
+        # Per-request fields never leak into the memoized response
+        cached = _load_statsig_response()
+        assert cached is None or cached.get('evaluated_keys') != {'userID': 'b'}
+
+    def test_import_installs_no_signal_handlers(self):
+        """Importing the app must not touch handlers inherited from the launcher."""
+        script = (
+            'import signal\n'
+            'before = {s: signal.getsignal(s) for s in signal.valid_signals()}\n'
+            'import src.main\n'
+            'after = {s: signal.getsignal(s) for s in signal.valid_signals()}\n'
+            'assert before == after, set(before.items()) ^ set(after.items())\n'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=Path(__file__).parents[1], capture_output=True, text=True,
+        )
+        assert result.returncode == 0, result.stderr
+
+    @pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason='no SIGUSR1')
+    def test_reload_signal_chains_and_restores(self):
+        from src.main import _install_statsig_reload, _load_statsig_response
+
+        calls = []
+        previous = signal.signal(signal.SIGUSR1, lambda *args: calls.append(args))
+        try:
+            _load_statsig_response()
+            restore = _install_statsig_reload()
+            signal.raise_signal(signal.SIGUSR1)
+            assert _load_statsig_response.cache_info().currsize == 0
+            assert len(calls) == 1
+            restore()
+            signal.raise_signal(signal.SIGUSR1)
+            assert len(calls) == 2
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+
+    @pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason='no SIGUSR1')
+    def test_reload_signal_skipped_off_main_thread(self):
+        """TestClient runs the lifespan in a worker thread; startup must not raise."""
+        before = signal.getsignal(signal.SIGUSR1)
+        with patch('src.main.fetch_models', new_callable=AsyncMock), TestClient(app):
+            assert signal.getsignal(signal.SIGUSR1) is before
+
+    @pytest.mark.parametrize('path', ['/v1/log_event', '/v1/rgstr'])
+    def test_statsig_success_stubs(self, client, path):
+        response = client.post(path, json={'events': [{'name': 'x'}]})
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/json'
+        assert response.json() == {'success': True}
+
+    def test_statsig_get_id_lists(self, client):
+        response = client.post('/v1/get_id_lists', json={})
+        assert response.status_code == 200
+        assert response.json() == {}
+
+    @pytest.mark.parametrize('path', ['/v1/log_event', '/v1/rgstr', '/v1/get_id_lists'])
+    async def test_statsig_stub_never_reads_body(self, path):
+        """Stubs answer without calling receive(), so bodies are not buffered."""
+        from src.main import StatsigShortCircuitMiddleware
+
+        downstream = AsyncMock()
+        receive = AsyncMock()
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = StatsigShortCircuitMiddleware(downstream)
+        scope = {'type': 'http', 'method': 'POST', 'path': path}
+        await middleware(scope, receive, send)
+
+        receive.assert_not_called()
+        downstream.assert_not_called()
+        assert sent[0]['status'] == 200
+
+    def test_statsig_stub_only_answers_post(self, client):
+        response = client.get('/v1/log_event')
+        assert response.status_code == 404
+
+    def test_unknown_path_returns_404(self, client):
+        response = client.get('/v1/some"thing')
+        assert response.status_code == 404
+        assert response.json() == {'error': {'message': 'Not found: /v1/some"thing'}}
+
+
+class TestModelsEndpoint:
+    """Tests for the model lookup endpoints."""
+
+    MODELS = {
+        'data': [
+            {
+                'id': 'anthropic/claude-sonnet-4.5',
+                'name': 'Claude Sonnet 4.5',
+                'created': 1700000002,
+            },
+        ]
+    }
+
+    def test_get_model_by_alias(self, client):
+        with patch.object(
+            models_module, '_cached_models', self.MODELS
+        ), patch.object(
+            models_module, '_model_index',
+            models_module._build_model_index(self.MODELS),
+        ):
+            response = client.get('/v1/models/claude-3-5-sonnet')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['id'] == 'claude-3-5-sonnet'
+        assert data['display_name'] == 'Claude Sonnet 4.5'
+        assert data['created_at'].startswith('2023-11-14')
+
+    def test_list_models_uses_precomputed_timestamps(self, client):
+        with patch.object(
+            models_module, '_cached_models', self.MODELS
+        ), patch.object(
+            models_module, '_model_index',
+            models_module._build_model_index(self.MODELS),
+        ):
+            response = client.get('/v1/models')
+        assert response.status_code == 200
+        data = response.json()
+        assert data['first_id'] == 'anthropic/claude-sonnet-4.5'
+        assert data['data'][0]['created_at'] == '2023-11-14T22:13:22+00:00'
+        assert '_created_at_iso' not in data['data'][0]
+
+    def test_get_unknown_model_is_synthesized(self, client):
+        with patch.object(
+            models_module, '_cached_models', self.MODELS
+        ), patch.object(
+            models_module, '_model_index',
+            models_module._build_model_index(self.MODELS),
+        ):
+            response = client.get('/v1/models/some-model')
+        assert response.status_code == 200
+        assert response.json()['display_name'] == 'some-model'
@@ -0,0 +1,161 @@
+"""Unit tests for CLI helpers."""
+
+import os
+
+import pytest
+import src.cli as cli
+from src.cli import tail_lines
+
+
+class TestTailLines:
+    """Tests for the backward-seeking log reader."""
+
+    def test_last_lines(self, tmp_path):
+        log = tmp_path / 'router.log'
+        log.write_bytes(b''.join(b'line %d\n' % i for i in range(100)))
+        assert tail_lines(log, 2) == [b'line 98\n', b'line 99\n']
+
+    def test_no_trailing_newline(self, tmp_path):
+        log = tmp_path / 'router.log'
+        log.write_bytes(b'a\nb\nc')
+        assert tail_lines(log, 2) == [b'b\n', b'c']
+
+    def test_fewer_lines_than_requested(self, tmp_path):
+        log = tmp_path / 'router.log'
+        log.write_bytes(b'only\n')
+        assert tail_lines(log, 50) == [b'only\n']
+
+    def test_spans_multiple_blocks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr('src.cli.TAIL_BLOCK_SIZE', 4)
+        log = tmp_path / 'router.log'
+        log.write_bytes(b'first line\nsecond line\nthird line\n')
+        assert tail_lines(log, 2) == [b'second line\n', b'third line\n']
+
+    def test_empty_file(self, tmp_path):
+        log = tmp_path / 'router.log'
+        log.write_bytes(b'')
+        assert tail_lines(log, 5) == []
+
+
+class TestFollowFile:
+    """Tests for `logs --follow` polling."""
+
+    def test_resumes_from_top_after_truncation(self, tmp_path, monkeypatch, capsysbinary):
+        log = tmp_path / 'router.log'
+        log.write_bytes(b'old line one\nold line two\n')
+        polls = []
+
+        def sleep(interval):
+            polls.append(interval)
+            if len(polls) == 1:
+                log.write_bytes(b'restarted\n')  # truncates, like start_server
+            else:
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr(cli.time, 'sleep', sleep)
+        cli.follow_file(log)
+        assert capsysbinary.readouterr().out == b'restarted\n'
+        assert len(polls) == 2
+
+
+class TestGetPid:
+    """Tests for PID file lookup."""
+
+    @pytest.fixture(autouse=True)
+    def pid_file(self, tmp_path, monkeypatch):
+        path = tmp_path / 'router.pid'
+        monkeypatch.setattr(cli, 'PID_FILE', path)
+        cli._invalidate_pid_cache()
+        yield path
+        cli._invalidate_pid_cache()
+
+    def test_running_pid(self, pid_file):
+        pid_file.write_text(str(os.getpid()))
+        assert cli.get_pid() == os.getpid()
+
+    def test_write_pid_file_roundtrip(self, pid_file):
+        cli.write_pid_file(os.getpid())
+        assert pid_file.read_bytes() == f'{os.getpid()}\n'.encode()
+        assert not pid_file.with_name(pid_file.name + '.tmp').exists()
+        assert cli.get_pid() == os.getpid()
+
+    def test_stale_pid_file_removed(self, pid_file, monkeypatch):
+        pid_file.write_text('12345')
+        monkeypatch.setattr(cli, '_is_alive', lambda pid: False)
+        assert cli.get_pid() is None
+        assert not pid_file.exists()
+
+    def test_result_cached_within_ttl(self, pid_file):
+        pid_file.write_text(str(os.getpid()))
+        assert cli.get_pid() == os.getpid()
+        pid_file.unlink()
+        assert cli.get_pid() == os.getpid()
+        cli._invalidate_pid_cache()
+        assert cli.get_pid() is None
+
+
+class TestMain:
+    """Tests for command dispatch."""
+
+    @pytest.fixture
+    def calls(self, monkeypatch):
+        recorded = []
+        monkeypatch.setattr(cli, 'start_server', lambda **kw: recorded.append(('start', kw)))
+        monkeypatch.setattr(cli, 'logs', lambda **kw: recorded.append(('logs', kw)))
+        return recorded
+
+    def test_start_detached(self, calls):
+        cli.main(['start', '-d'])
+        assert calls == [('start', {'detached': True})]
+
+    def test_logs_options(self, calls):
+        cli.main(['logs', '--follow', '-n', '10'])
+        assert calls == [('logs', {'follow': True, 'lines': 10})]
+
+    def test_logs_defaults(self, calls):
+        cli.main(['logs'])
+        assert calls == [('logs', {'follow': False, 'lines': 50})]
+
+    @pytest.mark.parametrize('opts', [['-n', '5'], ['-n5'], ['--lines', '5'], ['--lines=5']])
+    def test_logs_line_count_forms(self, calls, opts):
+        cli.main(['logs', *opts])
+        assert calls == [('logs', {'follow': False, 'lines': 5})]
+
+    @pytest.mark.parametrize('opts', [['-n', 'many'], ['-nmany'], ['--lines='], ['-n']])
+    def test_logs_bad_line_count(self, calls, opts):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(['logs', *opts])
+        assert exc.value.code == 2
+        assert calls == []
+
+    @pytest.mark.parametrize('argv', [
+        ['start', '--detach'],
+        ['start', 'now'],
+        ['stop', '-f'],
+        ['status', '--verbose'],
+        ['logs', '--linesx'],
+    ])
+    def test_unrecognized_option_exits_2(self, calls, capsys, argv):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(argv)
+        assert exc.value.code == 2
+        assert calls == []
+        assert 'unrecognized arguments' in capsys.readouterr().err
+
+    @pytest.mark.parametrize('argv', [['start', '--help'], ['logs', '-h'], ['--help']])
+    def test_help_prints_usage_without_running(self, calls, capsys, argv):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(argv)
+        assert exc.value.code == 0
+        assert calls == []
+        assert capsys.readouterr().out.startswith('usage: router')
+
+    def test_unknown_command_exits_2(self, calls, capsys):
+        with pytest.raises(SystemExit) as exc:
+            cli.main(['bogus'])
+        assert exc.value.code == 2
+        assert "invalid choice: 'bogus'" in capsys.readouterr().err
+
+    def test_no_command_prints_usage(self, capsys):
+        cli.main([])
+        assert capsys.readouterr().out.startswith('usage: router')
@@ -0,0 +1,239 @@
+"""Unit tests for streaming SSE transformation."""
+
+import json
+
+import httpx
+from src.stream import stream_openai_to_anthropic
+
+
+def _upstream(*chunks: dict | str) -> httpx.Response:
+    """Build an OpenAI-style SSE response from chunk dicts (or raw data strings)."""
+    lines = [
+        f'data: {c if isinstance(c, str) else json.dumps(c)}\n\n' for c in chunks
+    ]
+    return httpx.Response(200, content=''.join(lines).encode())
+
+
+async def _events(response: httpx.Response, input_tokens: int = 0) -> list[tuple[str, dict]]:
+    """Run the transformer and parse its output into (event, data) pairs."""
+    output = b''.join([
+        chunk async for chunk in stream_openai_to_anthropic(
+            response, 'claude-3-5-sonnet', input_tokens
+        )
+    ])
+    events = []
+    for frame in output.decode().split('\n\n'):
+        if not frame:
+            continue
+        event_line, data_line = frame.split('\n')
+        events.append((
+            event_line.removeprefix('event: '),
+            json.loads(data_line.removeprefix('data: ')),
+        ))
+    return events
+
+
+def _delta(**delta) -> dict:
+    return {'choices': [{'delta': delta}]}
+
+
+class TestStreamOpenAIToAnthropic:
+    """Tests for OpenAI -> Anthropic SSE conversion."""
+
+    async def test_text_stream(self):
+        events = await _events(_upstream(
+            _delta(content='Hello'),
+            _delta(content=' "world"'),
+            {'usage': {'prompt_tokens': 5, 'completion_tokens': 2}},
+            '[DONE]',
+        ), input_tokens=3)
+
+        assert [e for e, _ in events] == [
+            'message_start',
+            'content_block_start',
+            'content_block_delta',
+            'content_block_delta',
+            'content_block_stop',
+            'message_delta',
+            'message_stop',
+        ]
+        assert events[0][1]['message']['usage']['input_tokens'] == 3
+        assert events[1][1]['content_block'] == {'type': 'text', 'text': ''}
+        assert events[2][1]['delta'] == {'type': 'text_delta', 'text': 'Hello'}
+        assert events[3][1]['delta']['text'] == ' "world"'
+        assert events[4][1] == {'type': 'content_block_stop', 'index': 0}
+        assert events[5][1]['delta']['stop_reason'] == 'end_turn'
+        assert events[5][1]['usage'] == {'input_tokens': 5, 'output_tokens': 2}
+        assert events[6][1] == {'type': 'message_stop'}
+
+    async def test_reasoning_then_text(self):
+        events = await _events(_upstream(
+            _delta(reasoning='Thinking...'),
+            _delta(content='Answer'),
+        ))
+
+        kinds = [(e, d.get('index')) for e, d in events]
+        assert kinds == [
+            ('message_start', None),
+            ('content_block_start', 0),
+            ('content_block_delta', 0),
+            ('content_block_stop', 0),
+            ('content_block_start', 1),
+            ('content_block_delta', 1),
+            ('content_block_stop', 1),
+            ('message_delta', None),
+            ('message_stop', None),
+        ]
+        assert events[1][1]['content_block']['type'] == 'thinking'
+        assert events[2][1]['delta'] == {'type': 'thinking_delta', 'thinking': 'Thinking...'}
+        assert events[5][1]['delta'] == {'type': 'text_delta', 'text': 'Answer'}
+
+    async def test_tool_calls(self):
+        events = await _events(_upstream(
+            _delta(content='Checking.'),
+            _delta(tool_calls=[{
+                'id': 'call_1',
+                'function': {'name': 'get_weather', 'arguments': '{"loc'},
+            }]),
+            _delta(tool_calls=[{'function': {'arguments': 'ation": "NYC"}'}}]),
+            _delta(tool_calls=[{
+                'id': 'call_2',
+                'function': {'name': 'get_time', 'arguments': '{}'},
+            }]),
+        ))
+
+        starts = [d for e, d in events if e == 'content_block_start']
+        assert [s['index'] for s in starts] == [0, 1, 2]
+        assert starts[1]['content_block'] == {
+            'type': 'tool_use', 'id': 'call_1', 'name': 'get_weather', 'input': {},
+        }
+        assert starts[2]['content_block']['id'] == 'call_2'
+
+        partial = ''.join(
+            d['delta']['partial_json'] for e, d in events
+            if e == 'content_block_delta' and d['index'] == 1
+        )
+        assert json.loads(partial) == {'location': 'NYC'}
+
+        stops = [d['index'] for e, d in events if e == 'content_block_stop']
+        assert stops == [0, 1, 2]
+        assert events[-2][1]['delta']['stop_reason'] == 'tool_use'
+
+    async def test_tool_call_first_block_starts_at_zero(self):
+        events = await _events(_upstream(
+            _delta(role='assistant', content=None, tool_calls=[{
+                'id': 'call_1',
+                'function': {'name': 'get_time', 'arguments': '{}'},
+            }]),
+            _delta(content=''),
+        ))
+
+        starts = [d for e, d in events if e == 'content_block_start']
+        assert [s['index'] for s in starts] == [0]
+        assert starts[0]['content_block']['type'] == 'tool_use'
+        assert events[-2][1]['delta']['stop_reason'] == 'tool_use'
+
+    async def test_ignores_malformed_and_empty_lines(self):
+        response = httpx.Response(200, content=(
+            b': keep-alive\n\n'
+            b'data:\n'
+            b'data\n'
+            b'event: ping\n\n'
+            b'data: {not json}\n\n'
+            b'data: {"choices": []}\n\n'
+            b'data: {"choices": [{"delta": {}}]}\n\n'
+            b'data: {"choices": [{"delta": {"content": "ok"}}]}\n\n'
+            b'data: [DONE]\n\n'
+        ))
+        events = await _events(response)
+
+        deltas = [d['delta'] for e, d in events if e == 'content_block_delta']
+        assert deltas == [{'type': 'text_delta', 'text': 'ok'}]
+
+    async def test_lines_split_across_chunks(self):
+        async def chunks():
+            yield b'data: {"choices": [{"delta": {"con'
+            yield b'tent": "Hel"}}]}\r\n\r\ndata: {"choices": [{"delta"'
+            yield b': {"content": "lo"}}]}'
+
+        events = await _events(httpx.Response(200, content=chunks()))
+
+        texts = [d['delta']['text'] for e, d in events if e == 'content_block_delta']
+        assert texts == ['Hel', 'lo']
+
+    async def test_usage_on_finishing_content_frame(self):
+        events = await _events(_upstream(
+            _delta(content='Hi'),
+            {
+                'choices': [{'delta': {'content': '!'}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 7, 'completion_tokens': 3},
+            },
+        ))
+
+        assert events[-2][1]['usage'] == {'input_tokens': 7, 'output_tokens': 3}
+
+    async def test_length_finish_maps_to_max_tokens(self):
+        events = await _events(_upstream(
+            _delta(content='Truncat'),
+            {'choices': [{'delta': {}, 'finish_reason': 'length'}]},
+        ))
+
+        assert events[-2][1]['delta']['stop_reason'] == 'max_tokens'
+
+    async def test_usage_on_empty_content_frame(self):
+        events = await _events(_upstream(
+            _delta(content='Hi'),
+            {
+                'choices': [{
+                    'delta': {'role': 'assistant', 'content': ''},
+                    'finish_reason': None,
+                }],
+                'usage': {'prompt_tokens': 11, 'completion_tokens': 7},
+            },
+        ), input_tokens=3)
+
+        assert events[-2][1]['usage'] == {'input_tokens': 11, 'output_tokens': 7}
+
+    async def test_yields_bytes_chunks(self):
+        """Chunks are bytes so StreamingResponse sends them without re-encoding."""
+        chunks = [
+            chunk async for chunk in stream_openai_to_anthropic(
+                _upstream(_delta(content='Hi')), 'claude-3-5-sonnet'
+            )
+        ]
+        assert chunks and all(isinstance(c, bytes) for c in chunks)
+
+    async def test_empty_stream(self):
+        events = await _events(_upstream('[DONE]'))
+
+        assert [e for e, _ in events] == ['message_start', 'message_delta', 'message_stop']
+        assert events[1][1]['usage']['output_tokens'] == 0
+
+
+class TestStaticFrames:
+    """Prebuilt frames must match what _sse_event would produce."""
+
+    def test_static_frames_match_encoder(self):
+        from src.stream import _BLOCK_STOP_FMT, _MSG_STOP, _sse_event
+
+        assert _MSG_STOP == _sse_event('message_stop', {'type': 'message_stop'})
+        assert _BLOCK_STOP_FMT % 7 == _sse_event(
+            'content_block_stop', {'type': 'content_block_stop', 'index': 7}
+        )
+
+    def test_delta_templates_match_encoder(self):
+        import orjson
+        from src.stream import _INPUT_JSON_DELTA_FMT, _TEXT_DELTA_FMT
+        from src.stream import _THINKING_DELTA_FMT, _sse_event
+
+        value = 'quote " newline \n unicode \u00e9'
+        for fmt, delta_type, key in [
+            (_TEXT_DELTA_FMT, 'text_delta', 'text'),
+            (_THINKING_DELTA_FMT, 'thinking_delta', 'thinking'),
+            (_INPUT_JSON_DELTA_FMT, 'input_json_delta', 'partial_json'),
+        ]:
+            assert fmt % (2, orjson.dumps(value)) == _sse_event('content_block_delta', {
+                'type': 'content_block_delta',
+                'index': 2,
+                'delta': {'type': delta_type, key: value},
+            })
@@ -1,35 +1,54 @@
 """Unit tests for request/response transformations."""
 
+from types import MappingProxyType
+from unittest.mock import AsyncMock
+
+import httpx
 import pytest
 import src.models as models_module
 from src.models import _build_claude_aliases, map_model
 from src.transform import anthropic_to_openai, count_tokens
-from src.transform import openai_to_anthropic
-
-
-@pytest.fixture(autouse=True)
+from src.transform import _validate_tool_calls, openai_to_anthropic
+
+
+_FIXTURE_ALIASES = {
+    'haiku': 'anthropic/claude-haiku-4.5',
+    'sonnet': 'anthropic/claude-sonnet-4.5',
+    'opus': 'anthropic/claude-opus-4.5',
+}
+_FIXTURE_PARAMS = models_module._build_model_params({'data': [
+    {'id': 'anthropic/claude-sonnet-4.5', 'supported_parameters': [
+        'max_tokens', 'temperature', 'top_p', 'top_k', 'stop',
+        'tools', 'tool_choice', 'reasoning',
+    ]},
+    {'id': 'openai/gpt-5.1', 'supported_parameters': [
+        'max_tokens', 'stop', 'tools', 'tool_choice', 'reasoning',
+    ]},
+]})
+
+
+@pytest.fixture(scope='module')
 def mock_claude_aliases():
-    """Populate Claude aliases cache for testing.
+    """Populate Claude aliases cache once for the classes that request it.
+
+    Tests that replace the model globals must restore them themselves.
     """
-    models_module._claude_aliases = {
-        'haiku': 'anthropic/claude-haiku-4.5',
-        'sonnet': 'anthropic/claude-sonnet-4.5',
-        'opus': 'anthropic/claude-opus-4.5',
-    }
-    models_module._model_params = {
-        'anthropic/claude-sonnet-4.5': {
-            'max_tokens', 'temperature', 'top_p', 'top_k', 'stop',
-            'tools', 'tool_choice', 'reasoning',
-        },
-        'openai/gpt-5.1': {
-            'max_tokens', 'stop', 'tools', 'tool_choice', 'reasoning',
-        },
-    }
+    models_module._reset_model_cache()
+    models_module._claude_aliases = _FIXTURE_ALIASES
+    models_module._model_params = _FIXTURE_PARAMS
     yield
+    models_module._reset_model_cache()
     models_module._claude_aliases = None
     models_module._model_params = None
 
 
+# Read-only request template; tests copy it with dict(...) or {**_BASE_BODY, ...}
+_BASE_BODY = MappingProxyType({
+    'model': 'claude-3-5-sonnet',
+    'messages': [{'role': 'user', 'content': 'Hello'}],
+})
+
+
 class TestBuildClaudeAliases:
     """Tests for dynamic Claude alias extraction."""
 
@@ -86,51 +105,70 @@ class TestBuildClaudeAliases:
         assert aliases == {}
 
 
+@pytest.mark.usefixtures('mock_claude_aliases')
 class TestMapModel:
     """Tests for model name mapping."""
 
-    def test_passthrough_openrouter_model(self):
-        """OpenRouter model IDs pass through unchanged.
-        """
-        assert map_model('anthropic/claude-sonnet-4') == 'anthropic/claude-sonnet-4'
-        assert map_model('google/gemini-2.5-pro') == 'google/gemini-2.5-pro'
+    @pytest.mark.parametrize('model_in,expected', [
+        # OpenRouter model IDs pass through unchanged
+        ('anthropic/claude-sonnet-4', 'anthropic/claude-sonnet-4'),
+        ('google/gemini-2.5-pro', 'google/gemini-2.5-pro'),
+        # Tier aliases map to the newest model of that tier
+        ('claude-3-haiku', 'anthropic/claude-haiku-4.5'),
+        ('claude-3-5-haiku-20241022', 'anthropic/claude-haiku-4.5'),
+        ('claude-haiku-4-5-20250514', 'anthropic/claude-haiku-4.5'),
+        ('claude-3-5-sonnet', 'anthropic/claude-sonnet-4.5'),
+        ('claude-sonnet-4', 'anthropic/claude-sonnet-4.5'),
+        ('claude-sonnet-4-5-20250514', 'anthropic/claude-sonnet-4.5'),
+        ('claude-3-opus', 'anthropic/claude-opus-4.5'),
+        ('claude-opus-4-5-20251101', 'anthropic/claude-opus-4.5'),
+    ])
+    def test_map_model(self, model_in, expected):
+        assert map_model(model_in) == expected
 
-    def test_map_haiku(self):
-        """Haiku aliases map to newest haiku model.
+    def test_unknown_model_passthrough(self):
+        """Unknown models pass through unchanged.
         """
-        assert map_model('claude-3-haiku') == 'anthropic/claude-haiku-4.5'
-        assert map_model('claude-3-5-haiku-20241022') == 'anthropic/claude-haiku-4.5'
-        assert map_model('claude-haiku-4-5-20250514') == 'anthropic/claude-haiku-4.5'
+        assert map_model('some-other-model') == 'some-other-model'
 
-    def test_map_sonnet(self):
-        """Sonnet aliases map to newest sonnet model.
+    def test_repeat_lookups_hit_cache(self):
+        """Repeated names resolve from the cache without re-matching.
         """
-        assert map_model('claude-3-5-sonnet') == 'anthropic/claude-sonnet-4.5'
-        assert map_model('claude-sonnet-4') == 'anthropic/claude-sonnet-4.5'
-        assert map_model('claude-sonnet-4-5-20250514') == 'anthropic/claude-sonnet-4.5'
-
-    def test_map_opus(self):
-        """Opus aliases map to newest opus model.
+        map_model('claude-sonnet-4-5-20250929')
+        before = map_model.cache_info()
+        assert map_model('claude-sonnet-4-5-20250929') == 'anthropic/claude-sonnet-4.5'
+        after = map_model.cache_info()
+        assert (after.hits, after.misses) == (before.hits + 1, before.misses)
+
+    async def test_model_refresh_clears_cache(self, monkeypatch, request):
+        """Cached mappings are dropped when models are re-fetched.
         """
+        # fetch_models replaces the module-wide aliases; restore them afterwards
+        monkeypatch.setattr(models_module, '_claude_aliases', models_module._claude_aliases)
+        for name in ('_cached_models', '_model_params', '_model_index'):
+            monkeypatch.setattr(models_module, name, None)
+        request.addfinalizer(models_module._reset_model_cache)
         assert map_model('claude-3-opus') == 'anthropic/claude-opus-4.5'
-        assert map_model('claude-opus-4-5-20251101') == 'anthropic/claude-opus-4.5'
 
-    def test_unknown_model_passthrough(self):
-        """Unknown models pass through unchanged.
-        """
-        assert map_model('some-other-model') == 'some-other-model'
+        client = AsyncMock()
+        client.get.return_value = httpx.Response(
+            200,
+            json={'data': [{'id': 'anthropic/claude-opus-5', 'created': 1}]},
+            request=httpx.Request('GET', models_module.OPENROUTER_MODELS_URL),
+        )
+        await models_module.fetch_models(client)
+
+        assert map_model('claude-3-opus') == 'anthropic/claude-opus-5'
 
 
+@pytest.mark.usefixtures('mock_claude_aliases')
 class TestAnthropicToOpenAI:
     """Tests for Anthropic to OpenAI request conversion."""
 
     def test_simple_message(self):
         """Basic message conversion with model mapping.
         """
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-        }
+        body = dict(_BASE_BODY)
         result = anthropic_to_openai(body)
 
         assert result['model'] == 'anthropic/claude-sonnet-4.5'
@@ -140,9 +178,8 @@ class TestAnthropicToOpenAI:
 
     def test_with_system_string(self):
         body = {
-            'model': 'claude-3-5-sonnet',
+            **_BASE_BODY,
             'system': 'You are a helpful assistant.',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
         }
         result = anthropic_to_openai(body)
 
@@ -152,9 +189,8 @@ class TestAnthropicToOpenAI:
 
     def test_with_system_list(self):
         body = {
-            'model': 'claude-3-5-sonnet',
+            **_BASE_BODY,
             'system': [{'text': 'System prompt 1'}, {'text': 'System prompt 2'}],
-            'messages': [{'role': 'user', 'content': 'Hello'}],
         }
         result = anthropic_to_openai(body)
 
@@ -163,10 +199,7 @@ class TestAnthropicToOpenAI:
         assert result['messages'][1]['content'][0]['text'] == 'System prompt 2'
 
     def test_model_override(self):
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-        }
+        body = dict(_BASE_BODY)
         result = anthropic_to_openai(body, model_override='x-ai/grok-4')
 
         assert result['model'] == 'x-ai/grok-4'
@@ -218,8 +251,7 @@ class TestAnthropicToOpenAI:
 
     def test_tools_conversion(self):
         body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
+            **_BASE_BODY,
             'tools': [
                 {
                     'name': 'get_weather',
@@ -238,143 +270,139 @@ class TestAnthropicToOpenAI:
         assert result['tools'][0]['function']['name'] == 'get_weather'
         assert result['tools'][0]['function']['description'] == 'Get current weather'
 
-    def test_stream_flag(self):
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'stream': True,
-        }
-        result = anthropic_to_openai(body)
-
-        assert result['stream'] is True
-
-    def test_temperature(self):
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'temperature': 0.7,
-        }
-        result = anthropic_to_openai(body)
-
-        assert result['temperature'] == 0.7
-
-    def test_reasoning_passthrough(self):
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'reasoning': {'effort': 'medium'},
-        }
-        result = anthropic_to_openai(body)
-
-        assert result['reasoning'] == {'effort': 'medium'}
-
-    def test_thinking_to_reasoning(self):
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'thinking': {'type': 'enabled', 'budget_tokens': 5000},
-        }
-        result = anthropic_to_openai(body)
-
-        assert result['reasoning'] == {'max_tokens': 5000}
-
     def test_no_reasoning_when_not_requested(self):
         """Reasoning is not added when neither reasoning nor thinking is specified.
         """
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-        }
+        body = dict(_BASE_BODY)
         result = anthropic_to_openai(body)
 
         assert 'reasoning' not in result
 
-    def test_max_tokens_passthrough(self):
-        """max_tokens is passed through to OpenAI format.
+    @pytest.mark.parametrize('patch,key,expected', [
+        pytest.param({'stream': True}, 'stream', True, id='stream'),
+        pytest.param({'temperature': 0.7}, 'temperature', 0.7, id='temperature'),
+        pytest.param({'max_tokens': 4096}, 'max_tokens', 4096, id='max_tokens'),
+        pytest.param({'top_p': 0.9}, 'top_p', 0.9, id='top_p'),
+        pytest.param({'top_k': 40}, 'top_k', 40, id='top_k'),
+        pytest.param(
+            {'stop_sequences': ['\n\nHuman:', '\n\nAssistant:']},
+            'stop', ['\n\nHuman:', '\n\nAssistant:'], id='stop_sequences-to-stop',
+        ),
+        pytest.param(
+            {'reasoning': {'effort': 'medium'}}, 'reasoning', {'effort': 'medium'},
+            id='reasoning',
+        ),
+        pytest.param(
+            {'thinking': {'type': 'enabled', 'budget_tokens': 5000}},
+            'reasoning', {'max_tokens': 5000}, id='thinking-to-reasoning',
+        ),
+        pytest.param(
+            {'tool_choice': {'type': 'auto'}}, 'tool_choice', 'auto', id='tool_choice-auto',
+        ),
+        pytest.param(
+            {'tool_choice': {'type': 'any'}}, 'tool_choice', 'required', id='tool_choice-any',
+        ),
+        pytest.param(
+            {'tool_choice': {'type': 'tool', 'name': 'get_weather'}},
+            'tool_choice', {'type': 'function', 'function': {'name': 'get_weather'}},
+            id='tool_choice-tool',
+        ),
+    ])
+    def test_simple_field_mapping(self, patch, key, expected):
+        """Top-level request fields are passed through or renamed.
         """
+        result = anthropic_to_openai({**_BASE_BODY, **patch})
+
+        assert result[key] == expected
+
+
+@pytest.mark.usefixtures('mock_claude_aliases')
+class TestValidateToolCalls:
+    """Tests for tool_calls/tool message pairing."""
+
+    def test_keeps_answered_calls_only(self):
+        messages = [
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'assistant', 'content': 'Using tools', 'tool_calls': [
+                {'id': 'a'}, {'id': 'b'},
+            ]},
+            {'role': 'tool', 'tool_call_id': 'a', 'content': 'A'},
+            {'role': 'tool', 'tool_call_id': 'x', 'content': 'stray'},
+            {'role': 'user', 'content': 'Next'},
+        ]
+        result = _validate_tool_calls(messages)
+
+        assert result == [
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'assistant', 'content': 'Using tools', 'tool_calls': [{'id': 'a'}]},
+            {'role': 'tool', 'tool_call_id': 'a', 'content': 'A'},
+            {'role': 'user', 'content': 'Next'},
+        ]
+        # Input messages are not mutated
+        assert messages[1]['tool_calls'] == [{'id': 'a'}, {'id': 'b'}]
+
+    def test_drops_orphans(self):
+        messages = [
+            {'role': 'tool', 'tool_call_id': 'a', 'content': 'orphan'},
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'tool', 'tool_call_id': 'a', 'content': 'orphan'},
+            {'role': 'assistant', 'content': None, 'tool_calls': [{'id': 'b'}]},
+        ]
+        assert _validate_tool_calls(messages) == [{'role': 'user', 'content': 'Hi'}]
+
+    def test_unanswered_calls_stripped_without_tool_results(self):
         body = {
             'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'max_tokens': 4096,
+            'messages': [
+                {'role': 'user', 'content': [{'type': 'text', 'text': 'Hi'}]},
+                {'role': 'assistant', 'content': [
+                    {'type': 'text', 'text': 'Let me check'},
+                    {'type': 'tool_use', 'id': 'a', 'name': 't', 'input': {}},
+                ]},
+            ],
         }
         result = anthropic_to_openai(body)
+        assert result['messages'][-1] == {'role': 'assistant', 'content': 'Let me check'}
 
-        assert result['max_tokens'] == 4096
-
-    def test_top_p_passthrough(self):
-        """top_p is passed through to OpenAI format.
-        """
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'top_p': 0.9,
-        }
-        result = anthropic_to_openai(body)
 
-        assert result['top_p'] == 0.9
+@pytest.mark.usefixtures('mock_claude_aliases')
+class TestPlainChatFastPath:
+    """Tests for the string-only conversation fast path."""
 
-    def test_top_k_passthrough(self):
-        """top_k is passed through to OpenAI format.
-        """
-        body = {
+    def test_plain_chat_matches_block_conversion(self):
+        plain = {
             'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'top_k': 40,
+            'messages': [
+                {'role': 'user', 'content': 'Hello'},
+                {'role': 'assistant', 'content': 'Hi there'},
+            ],
         }
-        result = anthropic_to_openai(body)
-
-        assert result['top_k'] == 40
-
-    def test_stop_sequences_to_stop(self):
-        """stop_sequences is converted to stop in OpenAI format.
-        """
-        body = {
+        blocks = {
             'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'stop_sequences': ['\n\nHuman:', '\n\nAssistant:'],
-        }
-        result = anthropic_to_openai(body)
-
-        assert result['stop'] == ['\n\nHuman:', '\n\nAssistant:']
-
-    def test_tool_choice_auto(self):
-        """tool_choice type=auto converts to string 'auto'.
-        """
-        body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'tool_choice': {'type': 'auto'},
+            'messages': [
+                {'role': 'user', 'content': [{'type': 'text', 'text': 'Hello'}]},
+                {'role': 'assistant', 'content': [{'type': 'text', 'text': 'Hi there'}]},
+            ],
         }
-        result = anthropic_to_openai(body)
-
-        assert result['tool_choice'] == 'auto'
+        assert anthropic_to_openai(plain) == anthropic_to_openai(blocks)
 
-    def test_tool_choice_any(self):
-        """tool_choice type=any converts to string 'required'.
-        """
+    def test_fast_path_drops_extra_message_keys(self):
         body = {
             'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'tool_choice': {'type': 'any'},
+            'messages': [{'role': 'user', 'content': 'Hello', 'name': 'x'}],
         }
         result = anthropic_to_openai(body)
+        assert result['messages'] == [{'role': 'user', 'content': 'Hello'}]
 
-        assert result['tool_choice'] == 'required'
-
-    def test_tool_choice_specific_tool(self):
-        """tool_choice type=tool converts to OpenAI function format.
-        """
+    def test_fast_path_still_translates_params(self):
         body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
-            'tool_choice': {'type': 'tool', 'name': 'get_weather'},
+            **_BASE_BODY,
+            'stop_sequences': ['END'],
+            'tools': [{'name': 't', 'input_schema': {}}],
         }
         result = anthropic_to_openai(body)
-
-        assert result['tool_choice'] == {
-            'type': 'function',
-            'function': {'name': 'get_weather'},
-            }
+        assert result['stop'] == ['END']
+        assert result['tools'][0]['function']['name'] == 't'
 
 
 class TestOpenAIToAnthropic:
@@ -448,7 +476,39 @@ class TestOpenAIToAnthropic:
         assert result['content'][1]['type'] == 'text'
         assert result['content'][1]['text'] == 'The answer is 42.'
 
+    @pytest.mark.parametrize('finish_reason,expected', [
+        ('stop', 'end_turn'),
+        ('tool_calls', 'tool_use'),
+        ('length', 'max_tokens'),
+        ('content_filter', 'refusal'),
+        (None, 'end_turn'),
+        ('unexpected', 'end_turn'),
+    ])
+    def test_finish_reason_mapping(self, finish_reason, expected):
+        data = {'choices': [{'message': {'content': 'Hi'}, 'finish_reason': finish_reason}]}
+        result = openai_to_anthropic(data, 'anthropic/claude-sonnet-4')
+
+        assert result['stop_reason'] == expected
 
+    def test_tool_call_without_arguments(self):
+        data = {'choices': [{'message': {'tool_calls': [
+            {'id': 'a', 'function': {'name': 'now', 'arguments': ''}},
+            {'id': 'b', 'function': {'name': 'now'}},
+            {'id': 'c', 'function': {'name': 'now', 'arguments': '{bad'}},
+        ]}}]}
+        result = openai_to_anthropic(data, 'anthropic/claude-sonnet-4')
+
+        assert [c['input'] for c in result['content']] == [{}, {}, {}]
+
+    def test_empty_content_response(self):
+        data = {'choices': [{'message': {'content': None}, 'finish_reason': 'stop'}]}
+        result = openai_to_anthropic(data, 'anthropic/claude-sonnet-4')
+
+        assert result['content'] == []
+        assert result['stop_reason'] == 'end_turn'
+
+
+@pytest.mark.usefixtures('mock_claude_aliases')
 class TestParameterFiltering:
     """Tests for filtering unsupported parameters."""
 
@@ -456,8 +516,7 @@ class TestParameterFiltering:
         """Claude models support temperature, top_p, etc.
         """
         body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
+            **_BASE_BODY,
             'temperature': 0.7,
             'top_p': 0.9,
             'max_tokens': 1000,
@@ -472,8 +531,7 @@ class TestParameterFiltering:
         """OpenAI models don't support temperature/top_p in some cases.
         """
         body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
+            **_BASE_BODY,
             'temperature': 0.7,
             'top_p': 0.9,
             'max_tokens': 1000,
@@ -488,8 +546,7 @@ class TestParameterFiltering:
         """Unknown models pass through all params (no filtering).
         """
         body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
+            **_BASE_BODY,
             'temperature': 0.7,
             'top_p': 0.9,
         }
@@ -502,8 +559,7 @@ class TestParameterFiltering:
         """model, messages, and stream are always kept.
         """
         body = {
-            'model': 'claude-3-5-sonnet',
-            'messages': [{'role': 'user', 'content': 'Hello'}],
+            **_BASE_BODY,
             'stream': True,
         }
         result = anthropic_to_openai(body, model_override='openai/gpt-5.1')
@@ -541,3 +597,8 @@ class TestCountTokens:
             ]
         }
         assert count_tokens(body) == 3
+
+    def test_rounds_up_exact_boundaries(self):
+        assert count_tokens({'messages': []}) == 0
+        assert count_tokens({'messages': [{'content': 'abcd'}]}) == 1
+        assert count_tokens({'messages': [{'content': 'abcde'}]}) == 2